@@ -1,7 +1,11 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Hashable, NewType, Optional
 
-from psn_client import UnixTimestamp
+
+UnixTimestamp = NewType("UnixTimestamp", int)
 
 
 @dataclass
@@ -10,27 +14,156 @@ class CacheEntry:
     timestamp: UnixTimestamp
 
 
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class _Slot:
+    __slots__ = ("entry", "expires_at", "size")
+
+    def __init__(self, entry: CacheEntry, expires_at: Optional[float], size: int):
+        self.entry = entry
+        self.expires_at = expires_at
+        self.size = size
+
+
+_MISSING = object()
+
+
 class Cache:
-    def __init__(self):
-        self._entries: Dict[Any, CacheEntry] = {}
-
-    def get(self, key: Any, timestamp: UnixTimestamp):
-        entry: Optional[CacheEntry] = self._entries.get(key)
-        if entry is None:
-            return None
-        if entry.timestamp < timestamp:
-            return None
-        return entry.value
-
-    def update(self, key: Any, value: Any, timestamp: UnixTimestamp):
-        entry: Optional[CacheEntry] = self._entries.get(key)
-        if entry is None:
-            self._entries[key] = CacheEntry(value, timestamp)
-        else:
-            if entry.timestamp < timestamp:
-                entry.value = value
-                entry.timestamp = timestamp
+    """Timestamped values with optional LRU bounds (number of entries and total size) and per entry TTL.
+
+    `timestamp` is the moment a value was produced and lets readers ask for values not older than they need,
+    while TTL (in seconds of monotonic time) makes an entry disappear on its own. `max_size` bounds the total
+    size given by callers when storing values (e.g. byte length of a response body) or measured by `sizeof`;
+    entries of unknown size do not count towards it.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Any, _Slot]" = OrderedDict()
+        self._size = 0
+        self._computations: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Counter = Counter()
+        self.stats = CacheStats()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key: Any, timestamp: UnixTimestamp) -> Any:
+        slot = self._entries.get(key)
+        if slot is not None and slot.expires_at is not None and slot.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            slot = None
+        if slot is None or slot.entry.timestamp < timestamp:
+            self.stats.misses += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return slot.entry.value
+
+    def get(self, key: Any, timestamp: UnixTimestamp = UnixTimestamp(0)):
+        value = self._lookup(key, timestamp)
+        return None if value is _MISSING else value
+
+    def update(
+        self, key: Any, value: Any, timestamp: UnixTimestamp, ttl: Optional[float] = None, size: Optional[int] = None
+    ):
+        """Stores the value unless a newer one is already there; `ttl` overrides the default one"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        slot = self._entries.get(key)
+        if slot is not None and (slot.expires_at is None or slot.expires_at > now):
+            if slot.entry.timestamp > timestamp:
+                return
+        if slot is not None:
+            self._remove(key)
+
+        if size is None:
+            size = 0 if self._sizeof is None else self._sizeof(value)
+        self._entries[key] = _Slot(CacheEntry(value, timestamp), None if ttl is None else now + ttl, size)
+        self._size += size
+        self._evict()
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        timestamp: UnixTimestamp = UnixTimestamp(0),
+        ttl: Optional[float] = None
+    ) -> Any:
+        """Returns cached value or the result of `compute`, which is run once for all concurrent callers.
+
+        The computation is cancelled when all callers waiting for it are cancelled. Failed computations
+        are not cached.
+        """
+        value = self._lookup(key, timestamp)
+        if value is not _MISSING:
+            return value
+
+        computation = self._computations.get(key)
+        if computation is None:
+            computation = asyncio.ensure_future(compute())
+            self._computations[key] = computation
+            computation.add_done_callback(lambda future: self._computed(key, future, ttl))
+
+        self._waiters[computation] += 1
+        try:
+            return await asyncio.shield(computation)
+        finally:
+            self._waiters[computation] -= 1
+            if not self._waiters[computation]:
+                del self._waiters[computation]
+                if not computation.done():
+                    computation.cancel()
+
+    def _computed(self, key: Hashable, computation: asyncio.Future, ttl: Optional[float]):
+        del self._computations[key]
+        if computation.cancelled() or computation.exception() is not None:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return
+        self.update(key, computation.result(), UnixTimestamp(int(time.time())), ttl)
+
+    def remove(self, key: Any):
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def _remove(self, key: Any):
+        self._size -= self._entries.pop(key).size
+
+    def _evict(self):
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_size is not None and self._size > self.max_size)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.stats.evictions += 1
 
     def __iter__(self):
-        for key, entry in self._entries.items():
-            yield key, entry.value
+        for key, slot in list(self._entries.items()):
+            yield key, slot.entry.value
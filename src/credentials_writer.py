@@ -0,0 +1,62 @@
+import asyncio
+import copy
+import logging
+from typing import Any, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# seconds
+DEFAULT_DELAY = 2.0
+
+Credentials = Dict[str, Any]
+
+
+class CredentialsWriter:
+    """Stores credentials only when they differ from the last stored ones.
+
+    Scheduled writes are coalesced: all changes arriving within `delay` from the first one
+    are stored with a single call.
+    """
+
+    def __init__(self, store_credentials: Callable[[Credentials], None], delay: float = DEFAULT_DELAY):
+        self._store_credentials = store_credentials
+        self.delay = delay
+        self._stored: Optional[Credentials] = None
+        self._pending: Optional[Credentials] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def seed(self, credentials: Credentials):
+        """Sets credentials already stored by Galaxy, so they are not stored again"""
+        self._stored = copy.deepcopy(credentials)
+
+    def write(self, credentials: Credentials):
+        self._cancel_pending()
+        self._store_if_changed(credentials)
+
+    def schedule(self, credentials: Credentials):
+        if credentials == self._stored:
+            self._cancel_pending()
+            return
+        self._pending = credentials
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_event_loop().call_later(self.delay, self.flush)
+
+    def flush(self):
+        pending = self._pending
+        self._cancel_pending()
+        if pending is not None:
+            self._store_if_changed(pending)
+
+    def _cancel_pending(self):
+        self._pending = None
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def _store_if_changed(self, credentials: Credentials):
+        if credentials == self._stored:
+            logger.debug("Credentials not changed, skipping store")
+            return
+        self._stored = copy.deepcopy(credentials)
+        self._store_credentials(credentials)
@@ -1,8 +1,25 @@
+import asyncio
+import json
 import logging
+import time
+from http import HTTPStatus
+from itertools import count
+from typing import Any, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
 
 import aiohttp
-from galaxy.api.errors import UnknownBackendResponse
-from galaxy.http import handle_exception, create_client_session
+from galaxy.api.errors import BackendError, UnknownBackendResponse
+from galaxy.http import handle_exception, create_client_session, create_tcp_connector
+
+from cache import Cache, UnixTimestamp
+from metrics import HttpMetrics
+from pagination import DEFAULT_MAX_WINDOW
+from retry import RetryPolicy
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 OAUTH_LOGIN_REDIRECT_URL = "https://www.playstation.com/"
 
@@ -17,6 +34,32 @@ OAUTH_LOGIN_URL = OAUTH_LOGIN_URL.format(redirect_url=OAUTH_LOGIN_REDIRECT_URL)
 REFRESH_COOKIES_URL = OAUTH_LOGIN_URL
 
 DEFAULT_TIMEOUT = 30
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 20
+
+CONNECTIONS_LIMIT = 20
+# all concurrently fetched pages plus requests running alongside pagination
+CONNECTIONS_LIMIT_PER_HOST = DEFAULT_MAX_WINDOW + 2
+DNS_CACHE_TTL = 10 * 60
+KEEPALIVE_TIMEOUT = 60
+
+# responses kept for conditional requests; least recently used are dropped, so pages of long lists
+# cannot keep the whole library in memory
+VALIDATED_RESPONSES_MAX_ENTRIES = 16
+# bytes of response bodies
+VALIDATED_RESPONSES_MAX_SIZE = 4 * 1024 * 1024
+
+PRECONNECT_URLS = [
+    "https://web.np.playstation.com/",
+    "https://store.playstation.com/",
+]
+
+
+def operation_name(url: str) -> str:
+    """GraphQL operation name or path of requested URL"""
+    split_url = urlsplit(url)
+    operation = parse_qs(split_url.query).get("operationName")
+    return operation[0] if operation else split_url.path
 
 
 class CookieJar(aiohttp.CookieJar):
@@ -33,42 +76,148 @@ class CookieJar(aiohttp.CookieJar):
             self._cookies_updated_callback(list(self))
 
 
+class ValidatedResponse(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    data: Any
+
+
 class HttpClient:
 
-    def __init__(self):
+    def __init__(self, retry_policy=None):
         self._cookie_jar = CookieJar()
-        self._session = create_client_session(cookie_jar=self._cookie_jar)
+        self._session = create_client_session(
+            cookie_jar=self._cookie_jar,
+            connector=create_tcp_connector(
+                limit=CONNECTIONS_LIMIT,
+                limit_per_host=CONNECTIONS_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT
+            ),
+            timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+        )
+        self._retry_policy = retry_policy or RetryPolicy()
+        self.metrics = HttpMetrics()
+        self._validated_responses = Cache(
+            max_entries=VALIDATED_RESPONSES_MAX_ENTRIES, max_size=VALIDATED_RESPONSES_MAX_SIZE
+        )
 
     async def close(self):
+        self.metrics.dump()
         await self._session.close()
 
-    async def _request(self, method, url, *args, **kwargs):
+    async def _request(self, method, url, *args, read=None, **kwargs):
+        """Returns response or, when given, result of `read` coroutine receiving the response body.
+
+        Reading is a part of the attempt, so failures while the body is transferred are retried
+        and translated like the ones of the request itself.
+        """
+        operation = operation_name(url)
         with handle_exception():
-            return await self._session.request(method, url, *args, **kwargs)
+            for attempt in count(1):
+                start = time.monotonic()
+                try:
+                    response = await self._session.request(method, url, *args, **kwargs)
+                    result = response if read is None else await read(response)
+                    # latency includes the body transfer
+                    self.metrics.record_request(operation, response.status, time.monotonic() - start)
+                    return result
+                except UnknownBackendResponse as error:
+                    self.metrics.record_request(operation, type(error).__name__, time.monotonic() - start)
+                    raise
+                except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                    status = getattr(error, "status", None) or type(error).__name__
+                    self.metrics.record_request(operation, status, time.monotonic() - start)
+                    delay = self._retry_policy.retry_delay(method, operation, attempt, error)
+                    if delay is None:
+                        if isinstance(error, aiohttp.ClientPayloadError):
+                            raise BackendError(repr(error))
+                        raise
+                    logging.warning(f"Retrying {operation} in {delay:.2f}s after {error!r} (attempt {attempt})")
+                    await asyncio.sleep(delay)
 
     async def get(self, url, *args, **kwargs):
         silent = kwargs.pop('silent', False)
         get_json = kwargs.pop('get_json', True)
-        response = await self._request("GET", *args, url=url, **kwargs)
-        try:
-            raw_response = '***' if silent else await response.text()
-            logging.debug("Response for:\n{url}\n{data}".format(url=url, data=raw_response))
-            return await response.json() if get_json else await response.text()
-        except ValueError:
-            logging.exception("Invalid response data for:\n{url}".format(url=url))
-            raise UnknownBackendResponse()
+        validated = self._validated_responses.get((url, get_json))
+        if validated:
+            kwargs['headers'] = self._conditional_headers(validated, kwargs.get('headers'))
+
+        async def read(response):
+            if validated and response.status == HTTPStatus.NOT_MODIFIED:
+                response.release()
+                logging.debug("Response for:\n{url}\nnot modified".format(url=url))
+                return validated.data
+            body = await response.read()
+            self.metrics.record_bytes(operation_name(url), len(body))
+            self._log_response("Response for:\n{url}\n{data}", url, response, body, silent)
+            try:
+                if get_json:
+                    data = json_loads(body) if body.strip() else None
+                else:
+                    data = body.decode(response.get_encoding())
+            except ValueError:
+                logging.exception("Invalid response data for:\n{url}".format(url=url))
+                raise UnknownBackendResponse()
+            self._store_validators(url, get_json, response, data, len(body))
+            return data
+
+        return await self._request("GET", *args, url=url, read=read, **kwargs)
+
+    @staticmethod
+    def _log_response(message, url, response, body, silent=False):
+        if not logging.getLogger().isEnabledFor(logging.DEBUG):
+            return
+        data = '***' if silent else body.decode(response.get_encoding(), errors='replace')
+        logging.debug(message.format(url=url, data=data))
+
+    @staticmethod
+    def _conditional_headers(validated: ValidatedResponse, headers=None):
+        headers = dict(headers or {})
+        if validated.etag:
+            headers["If-None-Match"] = validated.etag
+        if validated.last_modified:
+            headers["If-Modified-Since"] = validated.last_modified
+        return headers
+
+    def _store_validators(self, url, get_json, response, data, size):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._validated_responses.update(
+                (url, get_json), ValidatedResponse(etag, last_modified, data), UnixTimestamp(int(time.time())),
+                size=size
+            )
+        else:
+            self._validated_responses.remove((url, get_json))
 
     async def post(self, url, *args, **kwargs):
         logging.debug("Sending data:\n{url}".format(url=url))
         response = await self._request("POST", *args, url=url, **kwargs)
-        logging.debug("Response for post:\n{url}\n{data}".format(url=url, data=await response.text()))
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            self._log_response("Response for post:\n{url}\n{data}", url, response, await response.read())
         return response
 
     def set_cookies_updated_callback(self, callback):
         self._cookie_jar.set_cookies_updated_callback(callback)
 
     def update_cookies(self, cookies):
+        self._validated_responses.clear()
         self._cookie_jar.update_cookies(cookies)
 
+    async def preconnect(self, urls=PRECONNECT_URLS):
+        """Opens keep-alive connections (DNS lookup, TCP and TLS handshakes) to hosts used later by imports"""
+        async def connect(url):
+            start = time.monotonic()
+            try:
+                async with self._session.head(url, allow_redirects=False, raise_for_status=False):
+                    pass
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                logging.info(f"Cannot preconnect to {url}: {error!r}")
+            else:
+                logging.debug(f"Preconnected to {url} in {time.monotonic() - start:.3f}s")
+
+        await asyncio.gather(*[connect(url) for url in urls])
+
     async def refresh_cookies(self):
         await self.get(REFRESH_COOKIES_URL, silent=True, get_json=False)
@@ -0,0 +1,154 @@
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, MutableMapping, Optional, Union
+
+from cache import Cache, CacheEntry, UnixTimestamp
+from psn_client import GameRecord
+from serialization import SerializationVersionError, compress, loads, serialize
+
+
+logger = logging.getLogger(__name__)
+
+PURCHASED_GAMES = "purchased_games"
+PURCHASED_GAMES_FINGERPRINT = "purchased_games_fingerprint"
+PLAYED_GAMES = "played_games"
+PSPLUS_STATUS = "psplus_status"
+SUBSCRIPTION_GAMES = "subscription_games"
+PAGE_SIZES = "page_sizes"
+
+# seconds
+DEFAULT_TTLS = {
+    PURCHASED_GAMES: 60 * 60,
+    PURCHASED_GAMES_FINGERPRINT: 30 * 24 * 60 * 60,
+    PLAYED_GAMES: 60 * 60,
+    PSPLUS_STATUS: 6 * 60 * 60,
+    # subscription games catalog has its own refresh deadline
+    SUBSCRIPTION_GAMES: 24 * 60 * 60,
+    PAGE_SIZES: 30 * 24 * 60 * 60,
+}
+
+# lists of `GameRecord`; earlier versions stored dicts which are dropped on load
+GAME_RECORDS_KEYS = frozenset([PURCHASED_GAMES, PLAYED_GAMES])
+
+# characters of a single stored value; bigger values are kept in memory only
+DEFAULT_KEY_BUDGET = 1024 * 1024
+# characters of all stored values
+DEFAULT_TOTAL_BUDGET = 2 * 1024 * 1024
+# values dropped from persistent cache first when over the total budget, the cheapest to fetch again
+EVICTION_ORDER = [
+    PLAYED_GAMES, SUBSCRIPTION_GAMES, PURCHASED_GAMES, PAGE_SIZES, PSPLUS_STATUS, PURCHASED_GAMES_FINGERPRINT
+]
+
+
+@dataclass
+class PersistenceStats:
+    """Sizes in characters of serialized values before and after compression, push time in seconds"""
+    writes: int = 0
+    raw_size: int = 0
+    stored_size: int = 0
+    rejected: int = 0
+    evicted: int = 0
+    pushes: int = 0
+    push_time: float = 0.0
+
+    def to_dict(self) -> Dict[str, Union[int, float]]:
+        stats = asdict(self)
+        stats["push_time"] = round(self.push_time, 4)
+        return stats
+
+
+def now() -> UnixTimestamp:
+    return UnixTimestamp(int(time.time()))
+
+
+class LibraryCache:
+    """Timestamped library data mirrored to the Galaxy persistent cache.
+
+    Every data type is kept under its own persistent cache key as a serialized `CacheEntry`
+    and is considered fresh for its TTL since the moment it was fetched.
+    """
+
+    def __init__(
+        self,
+        persistent_cache: MutableMapping[str, Any],
+        ttls: Optional[Dict[str, int]] = None,
+        budgets: Optional[Dict[str, int]] = None,
+        total_budget: int = DEFAULT_TOTAL_BUDGET
+    ):
+        self._persistent_cache = persistent_cache
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.budgets = dict(budgets or {})
+        self.total_budget = total_budget
+        self.stats = PersistenceStats()
+        self._cache = Cache()
+        self._load()
+
+    def _load(self):
+        for key in self.ttls:
+            serialized = self._persistent_cache.get(key)
+            if serialized is None:
+                continue
+            try:
+                entry = loads(serialized)
+            except SerializationVersionError as e:
+                logger.info(f"Dropping {key} stored in outdated format: {e}")
+                continue
+            except Exception:
+                logger.exception(f"Cannot load {key} from persistent cache")
+                continue
+            if not isinstance(entry, CacheEntry):
+                continue
+            if key in GAME_RECORDS_KEYS and not all(isinstance(game, GameRecord) for game in entry.value):
+                logger.info(f"Dropping {key} stored in outdated format")
+                continue
+            self._cache.update(key, entry.value, entry.timestamp)
+
+    def get(self, key: str) -> Any:
+        """Returns value fetched within its TTL or None"""
+        return self._cache.get(key, UnixTimestamp(now() - self.ttls[key]))
+
+    def get_stale(self, key: str) -> Any:
+        """Returns the last known value regardless of its age or None"""
+        return self._cache.get(key, UnixTimestamp(0))
+
+    def touch(self, key: str):
+        """Makes the last known value fresh again, e.g. when it was found unchanged; persistent cache is not updated"""
+        value = self.get_stale(key)
+        if value is not None:
+            self._cache.update(key, value, now())
+
+    def update(self, key: str, value: Any, timestamp: Optional[UnixTimestamp] = None):
+        if key not in self.ttls:
+            raise KeyError(f"Unknown library cache key: {key}")
+        timestamp = now() if timestamp is None else timestamp
+        self._cache.update(key, value, timestamp)
+
+        serialized = serialize(CacheEntry(value, timestamp))
+        stored = compress(serialized)
+        self.stats.writes += 1
+        self.stats.raw_size += len(serialized)
+        self.stats.stored_size += len(stored)
+        if len(stored) > self.budgets.get(key, DEFAULT_KEY_BUDGET):
+            logger.warning(f"{key} takes {len(stored)} characters, over its budget; keeping it in memory only")
+            self.stats.rejected += 1
+            self._persistent_cache.pop(key, None)
+            return
+        self._persistent_cache[key] = stored
+        self._evict_over_budget()
+
+    def _evict_over_budget(self):
+        stored_sizes = {key: len(self._persistent_cache[key]) for key in self.ttls if key in self._persistent_cache}
+        total = sum(stored_sizes.values())
+        for key in EVICTION_ORDER:
+            if total <= self.total_budget:
+                break
+            if key in stored_sizes:
+                logger.info(f"Persistent cache over budget, dropping {key}")
+                del self._persistent_cache[key]
+                total -= stored_sizes[key]
+                self.stats.evicted += 1
+
+    def record_push(self, duration: float):
+        self.stats.pushes += 1
+        self.stats.push_time += duration
@@ -0,0 +1,100 @@
+import json
+import logging
+import math
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Optional, Sequence, Union
+
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of latency histogram buckets in milliseconds
+LATENCY_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# seconds
+DEFAULT_DUMP_INTERVAL = 5 * 60
+
+
+class LatencyHistogram:
+    """Fixed buckets histogram; percentiles are approximated by upper bound of the bucket they fall into"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self._buckets = tuple(buckets)
+        self._counts = [0] * (len(self._buckets) + 1)
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, latency_ms: float):
+        self._counts[bisect_left(self._buckets, latency_ms)] += 1
+        self.count += 1
+        self.max = max(self.max, latency_ms)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        cumulative = 0
+        for bucket, bucket_count in zip(self._buckets, self._counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(bucket, self.max)
+        return self.max
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.statuses: Counter = Counter()
+        self.bytes_received = 0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self) -> Dict[str, Union[int, float, Dict, None]]:
+        return {
+            "requests": self.requests,
+            "statuses": dict(self.statuses),
+            "bytes": self.bytes_received,
+            "p50": self.latency.percentile(50),
+            "p95": self.latency.percentile(95),
+            "p99": self.latency.percentile(99),
+            "max": self.latency.max,
+        }
+
+
+class HttpMetrics:
+    """Requests statistics per operation (GraphQL operation name or URL path)"""
+
+    def __init__(self, dump_interval: float = DEFAULT_DUMP_INTERVAL):
+        self.dump_interval = dump_interval
+        self._endpoints: Dict[str, EndpointMetrics] = {}
+        self._last_dump = time.monotonic()
+        # of all operations
+        self.requests = 0
+
+    def endpoint(self, operation: str) -> EndpointMetrics:
+        metrics = self._endpoints.get(operation)
+        if metrics is None:
+            metrics = self._endpoints[operation] = EndpointMetrics()
+        return metrics
+
+    def record_request(self, operation: str, status: Union[int, str], latency: float):
+        metrics = self.endpoint(operation)
+        metrics.requests += 1
+        self.requests += 1
+        metrics.statuses[str(status)] += 1
+        metrics.latency.record(latency * 1000)
+
+    def record_bytes(self, operation: str, received: int):
+        self.endpoint(operation).bytes_received += received
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {operation: metrics.to_dict() for operation, metrics in self._endpoints.items()}
+
+    def dump(self):
+        self._last_dump = time.monotonic()
+        if self._endpoints:
+            logger.info("HTTP metrics: %s", json.dumps(self.snapshot(), separators=(",", ":")))
+
+    def dump_if_due(self):
+        if time.monotonic() - self._last_dump >= self.dump_interval:
+            self.dump()
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from galaxy.api.errors import BackendError, BackendNotAvailable, BackendTimeout, TooManyRequests, \
+    UnknownBackendResponse
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_WINDOW = 1
+DEFAULT_MAX_WINDOW = 8
+DEFAULT_INITIAL_WINDOW = 2
+
+# pages answered faster than that let the window grow, slower ones shrink it
+DEFAULT_TARGET_LATENCY = 1.5
+
+THROTTLING_ERRORS = (TooManyRequests, BackendError, BackendNotAvailable, BackendTimeout)
+
+
+def next_page_offset(page_info: Dict[str, Any], offset: int, limit: int) -> Optional[int]:
+    """Returns offset of the page following the one described by `page_info` or None if it was the last one.
+
+    Lists without a total count either point to the next page (`nextOffset`) or only tell whether
+    the page is the last one (`isLast`), in which case the next page starts `limit` records further.
+    """
+    try:
+        next_offset = page_info.get("nextOffset")
+        if page_info.get("isLast", next_offset is None):
+            return None
+        next_offset = offset + limit if next_offset is None else int(next_offset)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise UnknownBackendResponse(e)
+    if next_offset <= offset:
+        raise UnknownBackendResponse(f"Pagination does not advance: {offset} -> {next_offset}")
+    return next_offset
+
+
+class ConcurrencyWindow:
+    """Limits the number of concurrently fetched pages.
+
+    The window grows by one slot for every page answered within the target latency and is halved
+    when the backend throttles (429/5xx) or a page takes longer than expected (AIMD).
+    """
+
+    def __init__(
+        self,
+        min_size: int = DEFAULT_MIN_WINDOW,
+        max_size: int = DEFAULT_MAX_WINDOW,
+        initial_size: int = DEFAULT_INITIAL_WINDOW,
+        target_latency: float = DEFAULT_TARGET_LATENCY
+    ):
+        if not 1 <= min_size <= max_size:
+            raise ValueError(f"Invalid window limits: {min_size}..{max_size}")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self._size = max(min_size, min(initial_size, max_size))
+        self._in_flight = 0
+        self._condition = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def __repr__(self):
+        return f"ConcurrencyWindow(size={self._size}, in_flight={self._in_flight}, " \
+               f"limits={self.min_size}..{self.max_size})"
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self._size)
+            self._in_flight += 1
+        start = time.monotonic()
+        try:
+            yield
+        except THROTTLING_ERRORS:
+            self.shrink()
+            raise
+        else:
+            self.record_latency(time.monotonic() - start)
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def record_latency(self, latency: float):
+        if latency <= self.target_latency:
+            self._resize(self._size + 1)
+        else:
+            self.shrink()
+
+    def shrink(self):
+        self._resize(self._size // 2)
+
+    def _resize(self, size: int):
+        size = max(self.min_size, min(size, self.max_size))
+        if size != self._size:
+            logger.debug("Pagination window resized: %d -> %d", self._size, size)
+            self._size = size
+
+
+DEFAULT_MIN_PAGE_SIZE = 25
+# pages answered within that time can be doubled, well below read timeout of a single request
+DEFAULT_PAGE_TARGET_LATENCY = 4.0
+DEFAULT_MAX_PAGE_BYTES = 4 * 1024 * 1024
+# seconds; limits of page size learned from the backend are checked again after that
+DEFAULT_PAGE_LIMIT_TTL = 7 * 24 * 60 * 60
+
+
+class PageSizeAdvisor:
+    """Learns size of pages requested from every paginated operation.
+
+    Every page costs a round trip, so pages grow while they are answered well within the target latency
+    and their payload stays below `max_page_bytes`. Slow pages shrink proportionally and timed out ones
+    are halved. When the backend returns fewer records than requested, that number becomes the upper limit.
+
+    A grown size is only a candidate until a page of that size is served: sizes the backend fails to serve fall
+    back to the last served one, and only served sizes are persisted. Deterministic rejections (4xx, GraphQL
+    errors) also make the fallback the upper limit. Limits expire after `limit_ttl` seconds of wall clock time.
+    """
+
+    def __init__(
+        self,
+        min_size: int = DEFAULT_MIN_PAGE_SIZE,
+        target_latency: float = DEFAULT_PAGE_TARGET_LATENCY,
+        max_page_bytes: int = DEFAULT_MAX_PAGE_BYTES,
+        limit_ttl: float = DEFAULT_PAGE_LIMIT_TTL,
+        clock: Callable[[], float] = time.time
+    ):
+        self.min_size = min_size
+        self.target_latency = target_latency
+        self.max_page_bytes = max_page_bytes
+        self.limit_ttl = limit_ttl
+        self._clock = clock
+        self._sizes: Dict[str, int] = {}
+        # operation -> (size, expiration timestamp)
+        self._limits: Dict[str, Tuple[int, float]] = {}
+        self._served: Dict[str, int] = {}
+        self.changed = False
+
+    def page_size(self, operation: str, default: int, max_size: int) -> int:
+        size = self._sizes.get(operation, default)
+        limit = self._limit(operation)
+        return max(1, min(size, max_size, max_size if limit is None else limit))
+
+    def _limit(self, operation: str) -> Optional[int]:
+        limit = self._limits.get(operation)
+        if limit is None:
+            return None
+        size, expires_at = limit
+        if expires_at <= self._clock():
+            logger.debug("Limit of %d records of %s per page expired", size, operation)
+            del self._limits[operation]
+            self.changed = True
+            return None
+        return size
+
+    def _set_limit(self, operation: str, size: int):
+        self._limits[operation] = (size, self._clock() + self.limit_ttl)
+        self.changed = True
+
+    def record(self, operation: str, size: int, latency: float, received_bytes: int):
+        """Learns from a page of `size` served within `latency`"""
+        if self._served.get(operation) != size:
+            self._served[operation] = size
+            self.changed = True
+        if latency <= 0 or received_bytes <= 0:
+            return
+        if latency <= self.target_latency:
+            new_size = size * 2
+        else:
+            new_size = int(size * self.target_latency / latency)
+        new_size = min(new_size, int(size * self.max_page_bytes / received_bytes))
+        self._set(operation, new_size)
+
+    def record_timeout(self, operation: str, size: int):
+        self._set(operation, size // 2)
+
+    def reject(self, operation: str, size: int, default: int, deterministic: bool) -> int:
+        """Falls back from `size` the backend failed to serve and returns the size to retry with.
+
+        Only `deterministic` rejections limit the size, transient failures do not stop it from growing again.
+        """
+        served = self._served.get(operation)
+        fallback = served if served is not None and served < size else default
+        if served is not None and served >= size:
+            del self._served[operation]
+        logger.warning(
+            "Backend failed to serve %d records of %s per page, falling back to %d", size, operation, fallback
+        )
+        self._sizes[operation] = fallback
+        self.changed = True
+        if deterministic:
+            limit = self._limit(operation)
+            self._set_limit(operation, fallback if limit is None else min(fallback, limit))
+        return fallback
+
+    def limit(self, operation: str, size: int):
+        if size > 0 and self._limit(operation) != size:
+            logger.info("Backend returns at most %d records of %s per page", size, operation)
+            self._set_limit(operation, size)
+
+    def _set(self, operation: str, size: int):
+        size = max(self.min_size, size)
+        if size != self._sizes.get(operation):
+            logger.debug("Page size of %s: %s -> %d", operation, self._sizes.get(operation), size)
+            self._sizes[operation] = size
+            self.changed = True
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Returns learned sizes to be persisted and marks them as saved"""
+        self.changed = False
+        sizes = {
+            operation: min(self._sizes.get(operation, served), served) for operation, served in self._served.items()
+        }
+        limits = {operation: [size, expires_at] for operation, (size, expires_at) in self._limits.items()}
+        return {"sizes": sizes, "limits": limits}
+
+    def load(self, snapshot: Optional[Dict[str, Dict[str, Any]]]):
+        if not snapshot:
+            return
+        try:
+            sizes = {operation: int(size) for operation, size in snapshot.get("sizes", {}).items()}
+            self._sizes.update(sizes)
+            # persisted sizes were served before
+            self._served.update(sizes)
+            for operation, limit in snapshot.get("limits", {}).items():
+                # limits stored without expiration may come from transient errors, they are learned again
+                if isinstance(limit, (list, tuple)):
+                    size, expires_at = limit
+                    self._limits[operation] = (int(size), float(expires_at))
+        except (AttributeError, TypeError, ValueError):
+            logger.warning("Cannot load learned page sizes: %s", snapshot)
@@ -1,20 +1,154 @@
+import importlib.util
 import json
 import logging
-from typing import List, Dict
+from abc import ABC, abstractmethod
+from html.parser import HTMLParser
+from typing import List, Dict, Optional
 
-from bs4 import BeautifulSoup
 from galaxy.api.errors import UnknownBackendResponse
 from galaxy.api.types import SubscriptionGame
 
 
 logger = logging.getLogger(__name__)
 
+_SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS = 'psw-strand-scroller'
+_SUBSCRIBED_GAMES_CSS_CLASS = 'ems-sdk-product-tile-link'
+_GAME_DATA_TAG = 'data-telemetry-meta'
+
+
+class SubscriptionGamesBackend(ABC):
+    """Extracts raw `data-telemetry-meta` values of game tiles from the first games paginator of the store page"""
+
+    name: str
+
+    @staticmethod
+    def is_available() -> bool:
+        return True
+
+    @abstractmethod
+    def extract(self, response: str) -> List[Optional[str]]:
+        pass
+
+
+def _has_paginator_class(css_classes) -> bool:
+    # while parsing, multi-valued `class` attribute may not be split yet
+    if isinstance(css_classes, str):
+        css_classes = css_classes.split()
+    return _SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS in (css_classes or [])
+
+
+class SoupStrainerBackend(SubscriptionGamesBackend):
+    """BeautifulSoup with pure-Python `html.parser`, building only the paginator subtree"""
+    name = "soup_strainer"
+
+    @staticmethod
+    def is_available() -> bool:
+        return importlib.util.find_spec("bs4") is not None
+
+    def extract(self, response: str) -> List[Optional[str]]:
+        # bs4 takes longer to import than the rest of the plugin, it is loaded only when needed
+        from bs4 import BeautifulSoup, SoupStrainer
+        strainer = SoupStrainer("ul", class_=_has_paginator_class)
+        parsed_html = BeautifulSoup(response, "html.parser", parse_only=strainer)
+        paginator = parsed_html.find("ul", class_=_SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS)
+        if not paginator:
+            raise NotFoundSubscriptionPaginator
+        logger.debug("HTML response slice of %s tag: \n%s", _SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS, paginator)
+        games = paginator.find_all("a", class_=_SUBSCRIBED_GAMES_CSS_CLASS)
+        return [getattr(game, 'attrs', {}).get(_GAME_DATA_TAG) for game in games]
+
+
+def _xpath_has_class(css_class):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')"
+
+
+class LxmlBackend(SubscriptionGamesBackend):
+    """`lxml.html` C parser with XPath lookup, used only when lxml is installed"""
+    name = "lxml"
+
+    _GAMES_XPATH = f"(//ul[{_xpath_has_class(_SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS)}])[1]" \
+                   f"//a[{_xpath_has_class(_SUBSCRIBED_GAMES_CSS_CLASS)}]"
+
+    @staticmethod
+    def is_available() -> bool:
+        return importlib.util.find_spec("lxml") is not None
+
+    def extract(self, response: str) -> List[Optional[str]]:
+        from lxml import etree, html
+        try:
+            document = html.document_fromstring(response)
+        except etree.ParserError:
+            raise NotFoundSubscriptionPaginator
+        if not document.xpath(f"//ul[{_xpath_has_class(_SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS)}]"):
+            raise NotFoundSubscriptionPaginator
+        return [game.get(_GAME_DATA_TAG) for game in document.xpath(self._GAMES_XPATH)]
+
+
+class _PaginatorParsed(Exception):
+    pass
+
+
+class _TelemetryMetaExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.paginator_found = False
+        self.games_data: List[Optional[str]] = []
+        self._paginator_depth = 0
+
+    @staticmethod
+    def _has_class(attrs, css_class):
+        return css_class in (dict(attrs).get("class") or "").split()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "ul":
+            if self._paginator_depth:
+                self._paginator_depth += 1
+            elif self._has_class(attrs, _SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS):
+                self.paginator_found = True
+                self._paginator_depth = 1
+        elif tag == "a" and self._paginator_depth and self._has_class(attrs, _SUBSCRIBED_GAMES_CSS_CLASS):
+            self.games_data.append(dict(attrs).get(_GAME_DATA_TAG))
+
+    def handle_endtag(self, tag):
+        if tag == "ul" and self._paginator_depth:
+            self._paginator_depth -= 1
+            if not self._paginator_depth:
+                # rest of the page is not needed
+                raise _PaginatorParsed
+
+
+class HTMLParserBackend(SubscriptionGamesBackend):
+    """Stdlib `html.parser` event handler, no tree is built at all"""
+    name = "html_parser"
+
+    def extract(self, response: str) -> List[Optional[str]]:
+        extractor = _TelemetryMetaExtractor()
+        try:
+            extractor.feed(response)
+            extractor.close()
+        except _PaginatorParsed:
+            pass
+        if not extractor.paginator_found:
+            raise NotFoundSubscriptionPaginator
+        return extractor.games_data
+
+
+# ordered from the fastest one, measured on the production store page
+BACKENDS = [LxmlBackend, HTMLParserBackend, SoupStrainerBackend]
+
+
+def default_backend() -> SubscriptionGamesBackend:
+    return next(backend() for backend in BACKENDS if backend.is_available())
+
 
 class PSNGamesParser:
 
-    _SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS = 'psw-strand-scroller'
-    _SUBSCRIBED_GAMES_CSS_CLASS = 'ems-sdk-product-tile-link'
-    _GAME_DATA_TAG = 'data-telemetry-meta'
+    _SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS = _SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS
+    _SUBSCRIBED_GAMES_CSS_CLASS = _SUBSCRIBED_GAMES_CSS_CLASS
+    _GAME_DATA_TAG = _GAME_DATA_TAG
+
+    def __init__(self, backend: Optional[SubscriptionGamesBackend] = None):
+        self._backend = backend or default_backend()
 
     def parse(self, response) -> List[SubscriptionGame]:
         try:
@@ -30,16 +164,9 @@ class PSNGamesParser:
     def _subscription_games(self, response: str) -> List[Dict]:
         """Scrapes all PS Plus Monthly games from https://store.playstation.com/subscriptions"""
 
-        parsed_html = BeautifulSoup(response, 'html.parser')
-        paginator = parsed_html.find("ul", class_=self._SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS)
-        if not paginator:
-            raise NotFoundSubscriptionPaginator
-        logger.debug("HTML response slice of %s tag: \n%s" % (self._SUBSCRIBED_GAMES_PAGINATOR_CSS_CLASS, paginator.decode_contents()))
-        games = paginator.find_all("a", class_=self._SUBSCRIBED_GAMES_CSS_CLASS)
         result = []
-        for game in games:
+        for game_data in self._backend.extract(response):
             try:
-                game_data = getattr(game, 'attrs', {}).get(self._GAME_DATA_TAG)
                 result.append(json.loads(game_data))
             except (json.JSONDecodeError, TypeError) as e:
                 logger.error(e)
@@ -0,0 +1,56 @@
+import logging
+from concurrent import futures
+from concurrent.futures import Executor
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+THREAD_POOL = "thread"
+PROCESS_POOL = "process"
+
+DEFAULT_MAX_WORKERS = 1
+
+# payloads smaller than that (in characters or estimated bytes) are parsed directly on the event loop,
+# as hopping to an executor would cost more than parsing itself
+DEFAULT_INLINE_THRESHOLD = 256 * 1024
+
+
+class ParsingExecutor:
+    """Pool used to run CPU-bound parsers outside of the event loop.
+
+    Process pool requires parsers and payloads to be picklable (module level functions or bound methods
+    of module level classes).
+    """
+
+    def __init__(
+        self,
+        kind: str = THREAD_POOL,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        inline_threshold: int = DEFAULT_INLINE_THRESHOLD
+    ):
+        if kind not in (THREAD_POOL, PROCESS_POOL):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.inline_threshold = inline_threshold
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            logger.debug(f"Starting parsing {self.kind} pool with {self.max_workers} workers")
+            # pool modules (multiprocessing in particular) are imported by `concurrent.futures` on first access
+            if self.kind == PROCESS_POOL:
+                self._executor = futures.ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="parser")
+        return self._executor
+
+    def is_inline(self, size: int) -> bool:
+        return size < self.inline_threshold
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
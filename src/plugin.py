@@ -1,16 +1,25 @@
+import asyncio
 import logging
 import sys
-from typing import List, Any, AsyncGenerator
+import time
+from itertools import chain
+from typing import Dict, List, Any, AsyncGenerator, Optional
 
 from galaxy.api.consts import Platform, LicenseType
-from galaxy.api.errors import InvalidCredentials
+from galaxy.api.errors import InvalidCredentials, UnknownBackendResponse
 from galaxy.api.plugin import Plugin, create_and_run_plugin
 from galaxy.api.types import Authentication, Game, NextStep, SubscriptionGame, \
     Subscription, LicenseInfo
 
+from credentials_writer import CredentialsWriter
 from http_client import HttpClient
 from http_client import OAUTH_LOGIN_URL, OAUTH_LOGIN_REDIRECT_URL
-from psn_client import PSNClient
+from library_cache import LibraryCache, now, PAGE_SIZES, PURCHASED_GAMES, PURCHASED_GAMES_FINGERPRINT, PLAYED_GAMES, \
+    PSPLUS_STATUS, SUBSCRIPTION_GAMES
+from psn_client import GameRecord, PSNClient
+from scheduler import RefreshScheduler
+from subscription_catalog import SubscriptionCatalog
+from tasks import gather_or_cancel
 
 from version import __version__
 
@@ -25,31 +34,94 @@ AUTH_PARAMS = {
 
 logger = logging.getLogger(__name__)
 
+_NOT_PREFETCHED = object()
+
+# name of the background refresh of owned games
+OWNED_GAMES = "owned_games"
+
 
 class PSNPlugin(Plugin):
+    # warm up connections to PSN hosts while authenticating
+    PRECONNECT = True
+    # start fetching library and subscriptions right after authentication, before Galaxy asks for them
+    PREFETCH = False
+    # seconds between background refreshes; owned games are checked for changes once Galaxy imported them
+    LIBRARY_SYNC_INTERVAL = 15 * 60
+    # shorter than TTL of PS Plus status, so it is never fetched when Galaxy asks for it
+    PSPLUS_STATUS_REFRESH_INTERVAL = 5 * 60 * 60
+    # catalog is fetched again only once past its refresh deadline
+    SUBSCRIPTION_GAMES_REFRESH_INTERVAL = 60 * 60
+
     def __init__(self, reader, writer, token):
         super().__init__(Platform.Psn, __version__, reader, writer, token)
         self._http_client = HttpClient()
         self._psn_client = PSNClient(self._http_client)
+        self._library_cache = LibraryCache(self.persistent_cache)
+        self._credentials_writer = CredentialsWriter(lambda credentials: self.store_credentials(credentials))
+        self._subscription_catalog_revalidation = None
+        self._prefetches: Dict[str, asyncio.Task] = {}
+        self._owned_games: Optional[Dict[str, GameRecord]] = None
+        self._scheduler = RefreshScheduler(self.create_task, lambda: self._http_client.metrics.requests)
         logging.getLogger("urllib3").setLevel(logging.FATAL)
 
+    def handshake_complete(self):
+        self._library_cache = LibraryCache(self.persistent_cache)
+        self._psn_client.page_sizes.load(self._library_cache.get_stale(PAGE_SIZES))
+
     async def _do_auth(self, cookies):
         if not cookies:
             raise InvalidCredentials()
 
         self._http_client.set_cookies_updated_callback(self._update_stored_cookies)
         self._http_client.update_cookies(cookies)
+        if self.PRECONNECT:
+            self.create_task(self._http_client.preconnect(), "preconnect")
         await self._http_client.refresh_cookies()
         user_id, user_name = await self._psn_client.async_get_own_user_info()
         if user_id == "":
             raise InvalidCredentials()
+        if self.PREFETCH:
+            self._start_prefetch()
+        self._scheduler.add(PSPLUS_STATUS, self._refresh_psplus_status, self.PSPLUS_STATUS_REFRESH_INTERVAL)
+        self._scheduler.add(
+            SUBSCRIPTION_GAMES, self._refresh_subscription_catalog, self.SUBSCRIPTION_GAMES_REFRESH_INTERVAL
+        )
         return Authentication(user_id=user_id, user_name=user_name)
 
+    def _start_prefetch(self):
+        loaders = {
+            PURCHASED_GAMES: self._get_purchased_games,
+            PLAYED_GAMES: self._get_played_games,
+            PSPLUS_STATUS: self._get_psplus_status,
+            SUBSCRIPTION_GAMES: self._get_subscription_catalog,
+        }
+        for key, loader in loaders.items():
+            if key not in self._prefetches:
+                self._prefetches[key] = self.create_task(self._prefetch(key, loader), f"prefetch {key}")
+
+    @staticmethod
+    async def _prefetch(key, loader):
+        try:
+            return await loader()
+        except Exception:
+            logger.warning(f"Prefetch of {key} failed", exc_info=True)
+            return _NOT_PREFETCHED
+
+    async def _prefetched(self, key, loader):
+        """Returns result of prefetch of `key`, in flight or finished, or loads it when there is none"""
+        prefetch = self._prefetches.pop(key, None)
+        if prefetch is not None:
+            result = await prefetch
+            if result is not _NOT_PREFETCHED:
+                return result
+        return await loader()
+
     async def authenticate(self, stored_credentials=None):
         stored_cookies = stored_credentials.get("cookies") if stored_credentials else None
         if not stored_cookies:
             return NextStep("web_session", AUTH_PARAMS)
 
+        self._credentials_writer.seed(stored_credentials)
         auth_info = await self._do_auth(stored_cookies)
         return auth_info
 
@@ -62,39 +134,163 @@ class PSNPlugin(Plugin):
         credentials = {
             "cookies": cookies
         }
-        self.store_credentials(credentials)
+        self._credentials_writer.write(credentials)
 
     def _update_stored_cookies(self, morsels):
         cookies = {}
         for morsel in morsels:
             cookies[morsel.key] = morsel.value
-        self._store_cookies(cookies)
+        self._credentials_writer.schedule({"cookies": cookies})
 
     async def get_subscriptions(self) -> List[Subscription]:
-        is_plus_active = await self._psn_client.get_psplus_status()
+        is_plus_active = await self._prefetched(PSPLUS_STATUS, self._get_psplus_status)
         return [Subscription(subscription_name="PlayStation PLUS", end_time=None, owned=is_plus_active)]
 
+    async def _get_psplus_status(self):
+        is_plus_active = self._library_cache.get(PSPLUS_STATUS)
+        if is_plus_active is None:
+            is_plus_active = await self._psn_client.get_psplus_status()
+            self._update_library_cache(PSPLUS_STATUS, is_plus_active)
+        return is_plus_active
+
     async def get_subscription_games(self, subscription_name: str, context: Any) -> AsyncGenerator[List[SubscriptionGame], None]:
-        yield await self._psn_client.get_subscription_games()
+        catalog = await self._prefetched(SUBSCRIPTION_GAMES, self._get_subscription_catalog)
+        yield catalog.games
 
-    async def get_owned_games(self):
-        def game_parser(title):
-            return Game(
-                game_id=title["titleId"],
-                game_title=title["name"],
-                dlcs=[],
-                license_info=LicenseInfo(LicenseType.SinglePurchase, None)
+    async def _get_subscription_catalog(self):
+        catalog = self._library_cache.get_stale(SUBSCRIPTION_GAMES)
+        if not isinstance(catalog, SubscriptionCatalog):
+            catalog = SubscriptionCatalog.create(await self._psn_client.get_subscription_games(), now())
+            self._update_library_cache(SUBSCRIPTION_GAMES, catalog)
+        elif catalog.is_expired(now()):
+            self._start_subscription_catalog_revalidation(catalog)
+        return catalog
+
+    async def _refresh_psplus_status(self):
+        self._update_library_cache(PSPLUS_STATUS, await self._psn_client.get_psplus_status())
+
+    async def _refresh_subscription_catalog(self):
+        catalog = self._library_cache.get_stale(SUBSCRIPTION_GAMES)
+        if not isinstance(catalog, SubscriptionCatalog):
+            await self._get_subscription_catalog()
+        elif catalog.is_expired(now()):
+            self._start_subscription_catalog_revalidation(catalog)
+            await self._subscription_catalog_revalidation
+
+    def _start_subscription_catalog_revalidation(self, catalog):
+        if self._subscription_catalog_revalidation is None or self._subscription_catalog_revalidation.done():
+            self._subscription_catalog_revalidation = self.create_task(
+                self._revalidate_subscription_catalog(catalog), "revalidate subscription games"
             )
 
-        def parse_played_games(titles):
-            return [{"titleId": title["titleId"], "name": title["name"]} for title in titles]
+    async def _revalidate_subscription_catalog(self, catalog):
+        revalidated = catalog.revalidated(await self._psn_client.get_subscription_games(), now())
+        if revalidated.content_hash != catalog.content_hash:
+            logger.info("PS Plus games changed")
+        self._update_library_cache(SUBSCRIPTION_GAMES, revalidated)
+
+    async def get_owned_games(self):
+        owned_games = await self._get_owned_games(
+            self._prefetched(PURCHASED_GAMES, self._get_purchased_games),
+            self._prefetched(PLAYED_GAMES, self._get_played_games)
+        )
+        self._owned_games = owned_games
+        self._scheduler.add(OWNED_GAMES, self._sync_owned_games, self.LIBRARY_SYNC_INTERVAL)
+
+        license_info = LicenseInfo(LicenseType.SinglePurchase, None)
+        return [self._to_game(record, license_info) for record in owned_games.values()]
+
+    async def _get_owned_games(self, purchased_games_loader, played_games_loader) -> Dict[str, GameRecord]:
+        purchased_games, played_games = await gather_or_cancel(purchased_games_loader, played_games_loader)
+        if self._psn_client.page_sizes.changed:
+            self._update_library_cache(PAGE_SIZES, self._psn_client.page_sizes.snapshot())
+
+        # purchased record wins, order of first occurrence is kept
+        owned_games: Dict[str, GameRecord] = {}
+        for record in chain(played_games, purchased_games):
+            owned_games[record.title_id] = record
+        return owned_games
+
+    @staticmethod
+    def _to_game(record: GameRecord, license_info: Optional[LicenseInfo] = None) -> Game:
+        if license_info is None:
+            license_info = LicenseInfo(LicenseType.SinglePurchase, None)
+        return Game(game_id=record.title_id, game_title=record.name, dlcs=[], license_info=license_info)
+
+    async def _sync_owned_games(self):
+        """Notifies Galaxy about owned games added, removed or renamed since the last import or sync"""
+        # purchased games are probed with the cheap fingerprint request even when cached ones are fresh
+        owned_games = await self._get_owned_games(
+            self._get_purchased_games(revalidate=True), self._get_played_games()
+        )
+        known_games = self._owned_games
+        if known_games is None:
+            return
+
+        added = owned_games.keys() - known_games.keys()
+        removed = known_games.keys() - owned_games.keys()
+        renamed = {
+            title_id for title_id in owned_games.keys() & known_games.keys()
+            if owned_games[title_id].name != known_games[title_id].name
+        }
+        if added or removed or renamed:
+            logger.info(f"Owned games changed: {len(added)} added, {len(removed)} removed, {len(renamed)} renamed")
+
+        for title_id in removed:
+            self.remove_game(title_id)
+        for title_id, record in owned_games.items():
+            if title_id in added:
+                self.add_game(self._to_game(record))
+            elif title_id in renamed:
+                self.update_game(self._to_game(record))
+        self._owned_games = owned_games
+
+    async def _get_purchased_games(self, revalidate=False):
+        purchased_games = None if revalidate else self._library_cache.get(PURCHASED_GAMES)
+        if purchased_games is not None:
+            return purchased_games
+
+        try:
+            fingerprint = await self._psn_client.async_get_purchased_games_fingerprint()
+        except UnknownBackendResponse:
+            logger.warning("Cannot probe purchased games, fetching the whole list")
+            fingerprint = None
+
+        purchased_games = self._library_cache.get_stale(PURCHASED_GAMES)
+        if fingerprint is None or purchased_games is None \
+                or fingerprint != self._library_cache.get_stale(PURCHASED_GAMES_FINGERPRINT):
+            purchased_games = await self._psn_client.async_get_purchased_games()
+            if fingerprint is not None:
+                self._library_cache.update(PURCHASED_GAMES_FINGERPRINT, fingerprint)
+                self._update_library_cache(PURCHASED_GAMES, purchased_games)
+        else:
+            logger.info(f"Purchased games not changed since last import ({fingerprint}), using cached list")
+            # nothing to store, the list is only fresh again
+            self._library_cache.touch(PURCHASED_GAMES)
+        return purchased_games
+
+    async def _get_played_games(self):
+        played_games = self._library_cache.get(PLAYED_GAMES)
+        if played_games is None:
+            played_games = await self._psn_client.async_get_played_games()
+            self._update_library_cache(PLAYED_GAMES, played_games)
+        return played_games
+
+    def _update_library_cache(self, key, value):
+        self._library_cache.update(key, value)
+        start = time.perf_counter()
+        self.push_cache()
+        self._library_cache.record_push(time.perf_counter() - start)
+        logger.debug(f"Persistent cache pushed: {self._library_cache.stats.to_dict()}")
 
-        purchased_games = await self._psn_client.async_get_purchased_games()
-        played_games = parse_played_games(await self._psn_client.async_get_played_games())
-        unique_all_games = {game['titleId']: game for game in played_games + purchased_games}.values()
-        return [game_parser(game) for game in unique_all_games]
+    def tick(self):
+        self._http_client.metrics.dump_if_due()
+        self._scheduler.tick()
 
     async def shutdown(self):
+        self._credentials_writer.flush()
+        logger.info(f"Persistent cache stats: {self._library_cache.stats.to_dict()}")
+        self._psn_client.close()
         await self._http_client.close()
 
 
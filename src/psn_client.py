@@ -1,12 +1,19 @@
 import asyncio
 import logging
+import sys
+import time
 from functools import partial
-from typing import List, NewType
+from typing import List, NamedTuple, Optional
 
-from galaxy.api.errors import UnknownBackendResponse
+from galaxy.api.errors import BackendTimeout, UnknownBackendResponse, UnknownError
 from galaxy.api.types import SubscriptionGame
 
+from cache import Cache
+from http_client import operation_name as request_operation_name
+from pagination import ConcurrencyWindow, PageSizeAdvisor, next_page_offset
 from parsers import PSNGamesParser
+from parsing_executor import ParsingExecutor
+from tasks import gather_or_cancel
 
 
 GAME_LIST_URL = "https://web.np.playstation.com/api/graphql/v1/op" \
@@ -16,7 +23,7 @@ GAME_LIST_URL = "https://web.np.playstation.com/api/graphql/v1/op" \
 
 PLAYED_GAME_LIST_URL = "https://web.np.playstation.com/api/graphql/v1/op" \
                        "?operationName=getUserGameList" \
-                       '&variables={{"categories":"ps3_game,ps4_game,ps5_native_game","limit":{size}}}' \
+                       '&variables={{"categories":"ps3_game,ps4_game,ps5_native_game","limit":{size}{offset_variable}}}' \
                        '&extensions={{"persistedQuery":{{"version":1,"sha256Hash":"e780a6d8b921ef0c59ec01ea5c5255671272ca0d819edb61320914cf7a78b3ae"}}}}'
 
 USER_INFO_URL = "https://web.np.playstation.com/api/graphql/v1/op" \
@@ -29,19 +36,108 @@ PSN_PLUS_SUBSCRIPTIONS_URL = 'https://store.playstation.com/subscriptions'
 DEFAULT_LIMIT = 100
 
 # 100 is a maximum possible value to provide
-PLAYED_GAME_LIST_URL = PLAYED_GAME_LIST_URL.format(size=DEFAULT_LIMIT)
+PLAYED_GAMES_LIMIT = 100
 
-UnixTimestamp = NewType("UnixTimestamp", int)
+# learned page size of purchased games never exceeds that; backend returning less lowers it further
+PURCHASED_GAMES_MAX_LIMIT = 1000
+
+# errors the backend may answer a too large page with; the page is fetched again with a smaller size.
+# 5xx are retried by the http client and do not mean the size was wrong
+PAGE_SIZE_ERRORS = (UnknownBackendResponse, UnknownError)
+
+# seconds for which responses are shared by subsequent identical requests
+DEFAULT_MEMO_TTL = 10
+DEFAULT_MEMO_ENTRIES = 64
+
+# rough size of a single game record in GraphQL responses, used to decide whether to parse pages in executor
+ESTIMATED_RECORD_SIZE = 1024
+
+class GameRecord(NamedTuple):
+    """Title as needed by the plugin; ids are interned as the same title comes from several lists"""
+    title_id: str
+    name: str
+
+
+def parse_pages(parser, responses):
+    return [rec for res in responses for rec in parser(res)]
+
+
+def page_records(result) -> Optional[list]:
+    """Records of a page, i.e. the list next to its `pageInfo`"""
+    for value in result.values():
+        if isinstance(value, list):
+            return value
+    return None
+
+
+def offset_variable(offset: int) -> str:
+    """`offset` variable of lists requesting the first page without it, as they did before being paginated"""
+    return f',"offset":{offset}' if offset else ""
+
+
+def count_page_records(result) -> Optional[int]:
+    records = page_records(result)
+    return None if records is None else len(records)
+
+
+def parse_game_records(titles) -> List[GameRecord]:
+    intern = sys.intern
+    return [GameRecord(intern(title["titleId"]), title["name"]) for title in titles] if titles else []
+
+
+def parse_purchased_games(response):
+    try:
+        return parse_game_records(response['data']['purchasedTitlesRetrieve']['games'])
+    except (KeyError, TypeError) as e:
+        raise UnknownBackendResponse(e)
+
+
+def parse_played_games(response):
+    try:
+        return parse_game_records(response['data']['gameLibraryTitlesRetrieve']['games'])
+    except (KeyError, TypeError) as e:
+        raise UnknownBackendResponse(e)
 
 
 class PSNClient:
-    def __init__(self, http_client):
+    def __init__(
+        self,
+        http_client,
+        pagination_window=None,
+        parsing_executor=None,
+        memo_ttl=DEFAULT_MEMO_TTL,
+        page_sizes=None
+    ):
         self._http_client = http_client
+        self.pagination_window = pagination_window or ConcurrencyWindow()
+        self.page_sizes = page_sizes or PageSizeAdvisor()
+        self._parsing_executor = parsing_executor or ParsingExecutor()
+        self._memo = Cache(max_entries=DEFAULT_MEMO_ENTRIES, ttl=memo_ttl)
+
+    @property
+    def memo_ttl(self) -> float:
+        return self._memo.ttl
+
+    @memo_ttl.setter
+    def memo_ttl(self, ttl: float):
+        self._memo.ttl = ttl
 
-    @staticmethod
-    async def _async(method, *args, **kwargs):
+    def close(self):
+        self._parsing_executor.close()
+
+    async def _get(self, url, *args, **kwargs):
+        """Concurrent identical requests share one response, which is also reused for `memo_ttl` seconds"""
+        key = (url, args, tuple(sorted(kwargs.items())))
+        return await self._memo.get_or_compute(key, partial(self._http_client.get, url, *args, **kwargs))
+
+    async def _async(self, method, *args, **kwargs):
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, partial(method, *args, **kwargs))
+        return await loop.run_in_executor(self._parsing_executor.executor, partial(method, *args, **kwargs))
+
+    async def _parse(self, parser, response, size):
+        if self._parsing_executor.is_inline(size):
+            return parser(response)
+        return await self._async(parser, response)
 
     async def fetch_paginated_data(
         self,
@@ -51,33 +147,118 @@ class PSNClient:
         counter_name,
         limit=DEFAULT_LIMIT,
         *args,
+        max_limit=None,
         **kwargs
     ):
-        response = await self._http_client.get(url.format(size=limit, start=0), *args, **kwargs)
+        """Fetches all pages of a list; size of pages is learned up to `max_limit` starting from `limit`"""
+        size = self.page_sizes.page_size(operation_name, limit, max_limit or limit)
+
+        async def fetch_page(offset, size):
+            async with self.pagination_window.slot():
+                try:
+                    # pages are requested once, so they are neither shared nor memoized
+                    return await self._http_client.get(
+                        url.format(size=size, start=offset, offset_variable=offset_variable(offset)), *args, **kwargs
+                    )
+                except BackendTimeout:
+                    self.page_sizes.record_timeout(operation_name, size)
+                    raise
+
+        def result(response):
+            try:
+                return response["data"][operation_name]
+            except (KeyError, TypeError) as e:
+                raise UnknownBackendResponse(e)
+
+        def page_info(response):
+            # list without page info is served as a single page
+            try:
+                return result(response).get("pageInfo") or {}
+            except AttributeError as e:
+                raise UnknownBackendResponse(e)
+
+        def repeats(previous, response):
+            records = page_records(result(response))
+            return bool(records) and records == page_records(result(previous))
+
+        # the first page is fetched alone, so its latency and size are not affected by other pages
+        endpoint_metrics = self._http_client.metrics.endpoint(request_operation_name(url))
+        while True:
+            received_bytes = endpoint_metrics.bytes_received
+            start = time.monotonic()
+            response = None
+            try:
+                response = await fetch_page(0, size)
+                if response:
+                    # GraphQL errors come instead of data
+                    result(response)
+                break
+            except PAGE_SIZE_ERRORS as error:
+                if size <= limit:
+                    raise
+                deterministic = isinstance(error, UnknownError) or (isinstance(response, dict) and "errors" in response)
+                size = self.page_sizes.reject(operation_name, size, limit, deterministic)
         if not response:
             return []
+        self.page_sizes.record(
+            operation_name, size, time.monotonic() - start, endpoint_metrics.bytes_received - received_bytes
+        )
 
         try:
-            total = int(response["data"][operation_name]["pageInfo"].get(counter_name, 0))
-        except (ValueError, KeyError, TypeError) as e:
+            total = page_info(response).get(counter_name)
+            total = None if total is None else int(total)
+            records = count_page_records(result(response))
+        except (ValueError, AttributeError) as e:
             raise UnknownBackendResponse(e)
 
-        responses = [response] + await asyncio.gather(*[
-            self._http_client.get(url.format(size=limit, start=offset), *args, **kwargs)
-            for offset in range(limit, total, limit)
-        ])
+        if not page_info(response) and records == size:
+            logging.warning(f"{operation_name} returned {size} records without page info, the list may be truncated")
+        if records is not None and 0 < records < size and (
+            records < total if total is not None else page_info(response).get("isLast") is False
+        ):
+            # backend serves less than asked for, pages must follow what was actually returned
+            self.page_sizes.limit(operation_name, records)
+            size = records
+
+        responses = [response]
+        # a page repeating the previous one means the backend ignored its offset, there is nothing more to get
+        repeated = False
+        if total is not None:
+            # offset paging: the total is known upfront so the remaining pages are fetched concurrently
+            pages = await gather_or_cancel(*[
+                fetch_page(offset, size) for offset in range(size, total, size)
+            ])
+            for page in pages:
+                repeated = repeats(responses[-1], page)
+                if repeated:
+                    break
+                responses.append(page)
+        else:
+            # cursor paging: every page tells where the next one starts
+            offset = next_page_offset(page_info(response), 0, size)
+            while offset is not None:
+                page = await fetch_page(offset, size)
+                repeated = repeats(responses[-1], page)
+                if repeated:
+                    break
+                responses.append(page)
+                offset = next_page_offset(page_info(page), offset, size)
+        if repeated:
+            logging.warning(f"Pages of {operation_name} repeat, keeping the first {len(responses)} of them")
+        logging.debug(f"Fetched {len(responses)} pages of {operation_name} by {size}, {self.pagination_window}")
 
         try:
-            return [rec for res in responses for rec in parser(res)]
+            return await self._parse(partial(parse_pages, parser), responses, len(responses) * size * ESTIMATED_RECORD_SIZE)
         except Exception:
             logging.exception("Cannot parse data")
             raise UnknownBackendResponse()
 
     async def fetch_data(self, parser, *args, **kwargs):
-        response = await self._http_client.get(*args, **kwargs)
+        response = await self._get(*args, **kwargs)
 
         try:
-            return parser(response)
+            # single JSON page is small enough to be parsed in place
+            return await self._parse(parser, response, len(response) if isinstance(response, str) else 0)
         except Exception:
             logging.exception("Cannot parse data")
             raise UnknownBackendResponse()
@@ -108,26 +289,26 @@ class PSNClient:
     async def get_subscription_games(self) -> List[SubscriptionGame]:
         return await self.fetch_data(PSNGamesParser().parse, PSN_PLUS_SUBSCRIPTIONS_URL, get_json=False, silent=True)
 
-    async def async_get_purchased_games(self):
-        def games_parser(response):
+    async def async_get_purchased_games_fingerprint(self) -> str:
+        """Cheap probe of purchased games list: total number of titles and the newest one"""
+        def fingerprint_parser(response):
             try:
-                games = response['data']['purchasedTitlesRetrieve']['games']
-                return [
-                    {"titleId": title["titleId"], "name": title["name"]} for title in games
-                ] if games else []
-            except (KeyError, TypeError) as e:
+                purchased = response['data']['purchasedTitlesRetrieve']
+                total = int(purchased['pageInfo'].get('totalCount', 0))
+                newest = purchased['games'][0]['titleId'] if purchased['games'] else None
+                return f"{total}:{newest}"
+            except (ValueError, KeyError, TypeError, IndexError) as e:
                 raise UnknownBackendResponse(e)
 
-        return await self.fetch_paginated_data(games_parser, GAME_LIST_URL, "purchasedTitlesRetrieve", "totalCount")
+        return await self.fetch_data(fingerprint_parser, GAME_LIST_URL.format(size=1, start=0))
 
-    async def async_get_played_games(self):
-        def games_parser(response):
-            try:
-                games = response['data']['gameLibraryTitlesRetrieve']['games']
-                return [
-                    {"titleId": title["titleId"], "name": title["name"]} for title in games
-                ] if games else []
-            except (KeyError, TypeError) as e:
-                raise UnknownBackendResponse(e)
+    async def async_get_purchased_games(self) -> List[GameRecord]:
+        return await self.fetch_paginated_data(
+            parse_purchased_games, GAME_LIST_URL, "purchasedTitlesRetrieve", "totalCount",
+            max_limit=PURCHASED_GAMES_MAX_LIMIT
+        )
 
-        return await self.fetch_data(games_parser, PLAYED_GAME_LIST_URL)
+    async def async_get_played_games(self) -> List[GameRecord]:
+        return await self.fetch_paginated_data(
+            parse_played_games, PLAYED_GAME_LIST_URL, "gameLibraryTitlesRetrieve", "totalCount", PLAYED_GAMES_LIMIT
+        )
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict, deque
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from typing import Deque, Dict, Optional
+
+import aiohttp
+
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+RETRYABLE_STATUSES = frozenset([
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+])
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+# at most that many retries of a single operation within the budget window
+DEFAULT_RETRY_BUDGET = 10
+DEFAULT_BUDGET_WINDOW = 60.0
+
+
+def retry_after(error: aiohttp.ClientResponseError) -> Optional[float]:
+    """Returns delay requested by `Retry-After` header in seconds"""
+    value = (getattr(error, "headers", None) or {}).get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        logger.warning(f"Invalid Retry-After header: {value}")
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for idempotent requests failed with transient errors.
+
+    Retries of every operation are limited by a budget, so a backend that is down is not hammered
+    by retries of all concurrently fetched pages.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        budget: int = DEFAULT_RETRY_BUDGET,
+        budget_window: float = DEFAULT_BUDGET_WINDOW
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.budget_window = budget_window
+        self._retries: Dict[str, Deque[float]] = defaultdict(deque)
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRYABLE_STATUSES
+        # payload errors mean the body was cut off in transfer
+        return isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+    def retry_delay(self, method: str, operation: str, attempt: int, error: Exception) -> Optional[float]:
+        """Returns how long to wait before next attempt or None if request should not be retried"""
+        if method.upper() not in IDEMPOTENT_METHODS or attempt >= self.max_attempts or not self.is_retryable(error):
+            return None
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if isinstance(error, aiohttp.ClientResponseError):
+            requested_delay = retry_after(error)
+            if requested_delay is not None:
+                if requested_delay > self.max_delay:
+                    logger.warning(f"Not retrying {operation}, backend asked to wait {requested_delay:.0f}s")
+                    return None
+                delay = max(delay, requested_delay)
+
+        if not self._consume_budget(operation):
+            logger.warning(f"Retry budget of {operation} exhausted")
+            return None
+        return delay
+
+    def _consume_budget(self, operation: str) -> bool:
+        now = time.monotonic()
+        retries = self._retries[operation]
+        while retries and retries[0] <= now - self.budget_window:
+            retries.popleft()
+        if len(retries) >= self.budget:
+            return False
+        retries.append(now)
+        return True
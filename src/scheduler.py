@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 2
+# requests made by refreshes within an hour; enough for a few syncs of a changed large library
+DEFAULT_HOURLY_BUDGET = 120
+# fraction of the interval the next run is moved by at random, so refreshes do not run in lockstep
+DEFAULT_JITTER = 0.1
+
+BUDGET_WINDOW = 60 * 60
+
+Refresh = Callable[[], Awaitable[None]]
+StartTask = Callable[[Awaitable[None], str], asyncio.Task]
+
+
+@dataclass
+class Job:
+    name: str
+    refresh: Refresh
+    # seconds
+    interval: float
+    next_run: float
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+
+class RefreshScheduler:
+    """Runs background refreshes of datasets, each on its own jittered interval, from periodic `tick` calls.
+
+    At most `max_concurrency` refreshes run at once and no refresh starts once those finished within the last hour
+    made `hourly_budget` requests, as counted by `request_count` while they ran (requests of concurrent refreshes
+    and other calls made meanwhile count for each of them). Jobs that cannot start stay due and are started,
+    most overdue first, on later ticks.
+    """
+
+    def __init__(
+        self,
+        start_task: StartTask,
+        request_count: Callable[[], int],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        hourly_budget: int = DEFAULT_HOURLY_BUDGET,
+        jitter: float = DEFAULT_JITTER,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self._start_task = start_task
+        self._request_count = request_count
+        self.max_concurrency = max_concurrency
+        self.hourly_budget = hourly_budget
+        self.jitter = jitter
+        self._clock = clock
+        self.jobs: Dict[str, Job] = {}
+        # (finish time, requests) of refreshes
+        self._spent: Deque[Tuple[float, int]] = deque()
+
+    def add(self, name: str, refresh: Refresh, interval: float, delay: Optional[float] = None):
+        """Schedules `refresh` every `interval` seconds, first time after `delay` (by default the interval)"""
+        delay = interval if delay is None else delay
+        job = self.jobs.get(name)
+        task = job.task if job is not None else None
+        self.jobs[name] = Job(name, refresh, interval, self._clock() + self._jittered(delay), task)
+
+    def remove(self, name: str):
+        self.jobs.pop(name, None)
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _budget_left(self, now: float) -> int:
+        while self._spent and self._spent[0][0] <= now - BUDGET_WINDOW:
+            self._spent.popleft()
+        return self.hourly_budget - sum(requests for _, requests in self._spent)
+
+    def _charge(self, requests_before: int, _task: asyncio.Task):
+        self._spent.append((self._clock(), self._request_count() - requests_before))
+
+    def tick(self) -> List[asyncio.Task]:
+        """Starts due refreshes allowed by concurrency and budget limits and returns their tasks"""
+        now = self._clock()
+        due = sorted(
+            (job for job in self.jobs.values() if job.next_run <= now and not job.running),
+            key=lambda job: job.next_run
+        )
+        if not due:
+            return []
+
+        slots = self.max_concurrency - sum(job.running for job in self.jobs.values())
+        budget = self._budget_left(now)
+        if budget <= 0:
+            logger.debug(f"Budget of {self.hourly_budget} requests per hour used up, {len(due)} refreshes delayed")
+            return []
+
+        started = []
+        for job in due[:max(0, slots)]:
+            job.next_run = now + self._jittered(job.interval)
+            job.task = self._start_task(job.refresh(), f"refresh {job.name}")
+            job.task.add_done_callback(partial(self._charge, self._request_count()))
+            started.append(job.task)
+        return started
@@ -1,8 +1,137 @@
+"""Versioned text format of values kept in Galaxy persistent cache.
+
+Values are encoded as compact JSON prefixed with the format version. Types other than JSON ones are stored
+as single-key objects `{"~<tag>": [fields]}`; the same wrapping escapes plain dicts that have keys starting
+with `~`. Lists of game records, the bulk of the cache, are flattened into `{"~G": [id, name, id, name, ...]}`.
+Only registered types can be decoded, so nothing from the cache is ever executed.
+
+Payloads above `COMPRESSION_THRESHOLD` characters are deflated and base64 encoded under their own header.
+"""
 import base64
-import pickle
+import json
+import sys
+import zlib
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from galaxy.api.types import SubscriptionGame
+
+from cache import CacheEntry
+from psn_client import GameRecord
+from subscription_catalog import SubscriptionCatalog
+
+try:
+    from orjson import dumps as _json_dumps, loads as _json_loads
+
+    def _dumps_text(obj: Any) -> str:
+        return _json_dumps(obj).decode()
+except ImportError:
+    _json_loads = json.loads
+
+    def _dumps_text(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+VERSION = 2
+HEADER = f"psn{VERSION}:"
+COMPRESSED_HEADER = f"psn{VERSION}z:"
+
+# shorter payloads would not get smaller after deflating and base64 encoding
+COMPRESSION_THRESHOLD = 512
+COMPRESSION_LEVEL = 6
+
+_TAG_PREFIX = "~"
+
+
+class SerializationVersionError(ValueError):
+    """Value was stored in another (or legacy pickle) format"""
+
+
+# tag -> (type, fields getter, constructor)
+_TYPES: Dict[str, Tuple[Type, Callable[[Any], List], Callable[..., Any]]] = {
+    "~e": (CacheEntry, lambda entry: [entry.value, entry.timestamp], CacheEntry),
+    "~g": (GameRecord, list, GameRecord),
+    "~s": (
+        SubscriptionGame,
+        lambda game: [game.game_title, game.game_id, game.start_time, game.end_time],
+        SubscriptionGame
+    ),
+    "~c": (
+        SubscriptionCatalog,
+        lambda catalog: [catalog.games, catalog.content_hash, catalog.deadline],
+        SubscriptionCatalog
+    ),
+    "~t": (tuple, list, lambda *items: tuple(items)),
+    "~d": (dict, lambda obj: [[key, value] for key, value in obj.items()], lambda *items: dict(items)),
+}
+_TAGS = {type_: tag for tag, (type_, _, _) in _TYPES.items()}
+
+_GAME_RECORDS_TAG = "~G"
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _encode(obj: Any) -> Any:
+    if isinstance(obj, _SCALARS):
+        return obj
+    obj_type = type(obj)
+    if obj_type is list:
+        if obj and all(type(item) is GameRecord for item in obj):
+            return {_GAME_RECORDS_TAG: [field for record in obj for field in record]}
+        return [_encode(item) for item in obj]
+    if obj_type is dict and not any(isinstance(key, str) and key.startswith(_TAG_PREFIX) for key in obj):
+        if not all(isinstance(key, str) for key in obj):
+            raise TypeError(f"Cannot serialize dict with non-string keys: {obj!r}")
+        return {key: _encode(value) for key, value in obj.items()}
+    tag = _TAGS.get(obj_type)
+    if tag is None:
+        raise TypeError(f"Cannot serialize {obj_type.__name__}")
+    return {tag: [_encode(field) for field in _TYPES[tag][1](obj)]}
+
+
+def _decode(obj: Any) -> Any:
+    if type(obj) is list:
+        return [_decode(item) for item in obj]
+    if type(obj) is dict:
+        if len(obj) == 1:
+            tag, fields = next(iter(obj.items()))
+            if tag == _GAME_RECORDS_TAG:
+                intern = sys.intern
+                fields = iter(fields)
+                return [GameRecord(intern(title_id), name) for title_id, name in zip(fields, fields)]
+            if tag.startswith(_TAG_PREFIX):
+                try:
+                    constructor = _TYPES[tag][2]
+                except KeyError:
+                    raise ValueError(f"Unknown type tag: {tag}")
+                return constructor(*[_decode(field) for field in fields])
+        return {key: _decode(value) for key, value in obj.items()}
+    return obj
+
+
+def serialize(obj: Any) -> str:
+    """Returns uncompressed payload"""
+    return HEADER + _dumps_text(_encode(obj))
+
+
+def compress(serialized: str, threshold: int = COMPRESSION_THRESHOLD) -> str:
+    if len(serialized) < threshold or not serialized.startswith(HEADER):
+        return serialized
+    deflated = zlib.compress(serialized[len(HEADER):].encode(), COMPRESSION_LEVEL)
+    return COMPRESSED_HEADER + base64.b64encode(deflated).decode()
+
+
+def loads(s: str) -> Any:
+    if s.startswith(COMPRESSED_HEADER):
+        try:
+            text = zlib.decompress(base64.b64decode(s[len(COMPRESSED_HEADER):])).decode()
+        except (zlib.error, ValueError) as e:
+            raise ValueError(f"Corrupted compressed payload: {e}")
+    elif s.startswith(HEADER):
+        text = s[len(HEADER):]
+    else:
+        raise SerializationVersionError(f"Expected format {HEADER!r}, got {s[:8]!r}")
+    return _decode(_json_loads(text))
 
-def loads(s):
-    return pickle.loads(base64.decodebytes(s.encode()))
 
-def dumps(obj):
-    return base64.encodebytes(pickle.dumps(obj)).decode()
+def dumps(obj: Any) -> str:
+    return compress(serialize(obj))
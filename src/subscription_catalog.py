@@ -0,0 +1,76 @@
+import calendar
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from galaxy.api.types import SubscriptionGame
+
+from cache import UnixTimestamp
+
+
+# monthly games are published on the first Tuesday of a month, in the afternoon UTC
+CYCLE_WEEKDAY = calendar.TUESDAY
+CYCLE_HOUR_UTC = 17
+
+# seconds; lineup published late is looked for that often during the window following the cycle start
+RECHECK_INTERVAL = 6 * 60 * 60
+RECHECK_WINDOW = 3 * 24 * 60 * 60
+
+
+def cycle_start(year: int, month: int) -> datetime:
+    first_day = datetime(year, month, 1, CYCLE_HOUR_UTC, tzinfo=timezone.utc)
+    return first_day + timedelta(days=(CYCLE_WEEKDAY - first_day.weekday()) % 7)
+
+
+def current_cycle_start(now: UnixTimestamp) -> datetime:
+    moment = datetime.fromtimestamp(now, timezone.utc)
+    start = cycle_start(moment.year, moment.month)
+    if start > moment:
+        start = cycle_start(moment.year - (moment.month == 1), moment.month - 1 or 12)
+    return start
+
+
+def next_cycle_start(now: UnixTimestamp) -> datetime:
+    moment = datetime.fromtimestamp(now, timezone.utc)
+    start = cycle_start(moment.year, moment.month)
+    if start <= moment:
+        start = cycle_start(moment.year + (moment.month == 12), moment.month % 12 + 1)
+    return start
+
+
+def refresh_deadline(now: UnixTimestamp) -> UnixTimestamp:
+    deadline = UnixTimestamp(int(next_cycle_start(now).timestamp()))
+    if now - current_cycle_start(now).timestamp() < RECHECK_WINDOW:
+        deadline = min(deadline, UnixTimestamp(now + RECHECK_INTERVAL))
+    return deadline
+
+
+def content_hash(games: List[SubscriptionGame]) -> str:
+    digest = hashlib.sha256()
+    for game in sorted(games, key=lambda game: (game.game_id, game.game_title)):
+        digest.update(f"{game.game_id}\t{game.game_title}\n".encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class SubscriptionCatalog:
+    """Parsed PS Plus games, valid until `deadline` set to the next monthly lineup change"""
+    games: List[SubscriptionGame]
+    content_hash: str
+    deadline: UnixTimestamp
+
+    @classmethod
+    def create(cls, games: List[SubscriptionGame], now: UnixTimestamp) -> "SubscriptionCatalog":
+        return cls(games, content_hash(games), refresh_deadline(now))
+
+    def is_expired(self, now: UnixTimestamp) -> bool:
+        return now >= self.deadline
+
+    def revalidated(self, games: List[SubscriptionGame], now: UnixTimestamp) -> "SubscriptionCatalog":
+        """Returns catalog to keep after the games were fetched again; current one is kept when they are the same"""
+        new_hash = content_hash(games)
+        if new_hash != self.content_hash:
+            # new lineup is out, nothing changes until the next cycle
+            return SubscriptionCatalog(games, new_hash, UnixTimestamp(int(next_cycle_start(now).timestamp())))
+        return SubscriptionCatalog(self.games, self.content_hash, refresh_deadline(now))
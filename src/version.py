@@ -2,6 +2,30 @@ __version__ = "0.35"
 
 __changelog__ = {
     "unreleased": """
+        - Limit number of concurrently fetched pages with a window adapting to backend latency and throttling
+        - Skip downloading purchased games list when a cheap probe shows it has not changed since last import
+        - Keep owned games, PS Plus status and subscription games in persistent cache to answer imports without requests after restart
+        - Use conditional requests (ETag / Last-Modified) to avoid downloading unchanged responses
+        - Speed up parsing of PS Plus monthly games page; lxml is used when installed
+        - Parse large responses in a background thread to keep communication with Galaxy responsive
+        - Read and decode responses once, use orjson when installed and skip building debug logs when not needed
+        - Retry requests failed with transient errors (429, 5xx, connection errors) with backoff, respecting Retry-After
+        - Share responses of identical concurrent requests and reuse them for a few seconds
+        - Collect requests count, statuses, received bytes and latency percentiles per endpoint and log them periodically
+        - Tune connection pool (per host limit, DNS cache, keep-alive, connect/read timeouts) and warm up connections while authenticating
+        - Store refreshed cookies only when they change, batching bursts of cookie updates into a single write
+        - Keep owned games as compact records and merge purchased and played lists in a single pass
+        - Fetch purchased and played games concurrently, cancelling the other fetch when one of them fails
+        - Fetch all played games, not only the first 100, paginating lists by offset or by next page pointers
+        - Learn page size of paginated lists from response times and sizes and remember it between sessions
+        - Import BeautifulSoup and process pool modules only when first used to start the plugin faster
+        - Keep PS Plus games until the next monthly lineup change and revalidate them in the background afterwards
+        - Bound the in-memory response cache with LRU eviction and per entry TTL, sharing concurrent computations
+        - Store persistent cache in a compact versioned JSON format instead of pickle; entries in other formats are dropped
+        - Compress large persistent cache values, limit their size and log persistent cache push statistics
+        - Optionally start fetching library and subscriptions in the background right after authentication
+        - Check owned games periodically once imported and notify Galaxy only about added, removed and renamed games
+        - Refresh PS Plus status, PS Plus games and owned games in the background on jittered intervals within an hourly request budget
     """,
     "0.35": """
         - Fix pagination of fetched purchased games
@@ -0,0 +1,195 @@
+"""End to end benchmarks of the plugin against a local PSN stand-in server.
+
+Deselected by default, run with `pytest -m benchmark`. Results are appended to a JSON report
+(`benchmark_report.json` or path given in `PSN_BENCHMARK_REPORT` environment variable), so they can be compared
+between versions. Memory is the peak of Python allocations traced during a second run of each benchmarked
+operation by another plugin, so tracing does not slow down the timed run.
+"""
+import base64
+import json
+import os
+import pickle
+import platform
+import time
+import tracemalloc
+from unittest.mock import MagicMock
+
+import aiohttp
+import pytest
+
+import http_client
+import psn_client
+import serialization
+from cache import CacheEntry
+from plugin import PSNPlugin
+from tests.psn_server import PSNStandInServer, ServerConfig, STATS_PATH
+from version import __version__
+
+REPORT_PATH = os.environ.get("PSN_BENCHMARK_REPORT", "benchmark_report.json")
+
+
+def write_report(result):
+    try:
+        with open(REPORT_PATH, "r") as file_:
+            report = json.load(file_)
+    except (OSError, ValueError):
+        report = {"results": []}
+    report.update({
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    })
+    report["results"].append(result)
+    with open(REPORT_PATH, "w") as file_:
+        json.dump(report, file_, indent=2)
+
+
+async def server_stats(server, reset=False):
+    async with aiohttp.ClientSession() as session:
+        async with session.request("DELETE" if reset else "GET", server.url + STATS_PATH) as response:
+            return await response.json()
+
+
+@pytest.fixture()
+def stand_in_server(request, monkeypatch):
+    with PSNStandInServer(request.param) as server:
+        for module, name in [
+            (psn_client, "GAME_LIST_URL"),
+            (psn_client, "PLAYED_GAME_LIST_URL"),
+            (psn_client, "USER_INFO_URL"),
+            (psn_client, "PSN_PLUS_SUBSCRIPTIONS_URL"),
+            (http_client, "REFRESH_COOKIES_URL"),
+        ]:
+            monkeypatch.setattr(module, name, server.redirect(getattr(module, name)))
+        yield server
+
+
+@pytest.fixture()
+async def create_plugin(stand_in_server):
+    """Returns factory of authenticated plugins with nothing cached yet"""
+    plugins = []
+
+    async def create():
+        plugin = PSNPlugin(MagicMock(), MagicMock(), None)
+        plugins.append(plugin)
+        await plugin.authenticate({"cookies": {"npsso": "npsso"}})
+        return plugin
+
+    yield create
+    for plugin in plugins:
+        await plugin.shutdown()
+
+
+async def run_benchmark(name, server, create_plugin, operation):
+    """Times `operation` of a new plugin and measures its peak memory running it again with another one"""
+    plugin = await create_plugin()
+    await server_stats(server, reset=True)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    result = await operation(plugin)
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start
+    stats = await server_stats(server)
+
+    plugin = await create_plugin()
+    # restarted tracing forgets allocations and peak of previous benchmarks
+    tracemalloc.start()
+    try:
+        await operation(plugin)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    write_report({
+        "name": name,
+        "server": server.describe(),
+        "wall_time": round(wall_time, 4),
+        "cpu_time": round(cpu_time, 4),
+        "requests": stats.pop("requests", 0),
+        "errors": stats.pop("errors", 0),
+        "bytes_sent": stats.pop("bytes", 0),
+        "requests_by_operation": stats,
+        "peak_memory_kb": peak_memory // 1024,
+    })
+    return result
+
+
+def scenario(**kwargs):
+    config = ServerConfig(**kwargs)
+    return pytest.param(config, id="-".join(f"{key}={value}" for key, value in kwargs.items()))
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stand_in_server", [
+    scenario(library_size=100, latency=0.02),
+    scenario(library_size=1000, latency=0.02),
+    scenario(library_size=10000, latency=0.02),
+    scenario(library_size=10000, latency=0.1),
+    scenario(library_size=10000, latency=0.02, error_rate=0.05),
+], indirect=True)
+async def test_get_owned_games(create_plugin, stand_in_server):
+    config = stand_in_server.config
+    games = await run_benchmark(
+        "get_owned_games", stand_in_server, create_plugin, lambda plugin: plugin.get_owned_games()
+    )
+
+    assert len(games) == max(config.library_size, config.played_size)
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stand_in_server", [
+    scenario(subscription_games=20, latency=0.02),
+], indirect=True)
+async def test_get_subscriptions(create_plugin, stand_in_server):
+    async def import_subscriptions(plugin):
+        subscriptions = await plugin.get_subscriptions()
+        subscription_games = [games async for games in plugin.get_subscription_games("PlayStation PLUS", None)]
+        return subscriptions, subscription_games
+
+    subscriptions, subscription_games = await run_benchmark(
+        "get_subscriptions", stand_in_server, create_plugin, import_subscriptions
+    )
+
+    assert subscriptions[0].owned
+    assert len(subscription_games[0]) == stand_in_server.config.subscription_games
+
+
+def pickle_dumps(obj):
+    return base64.encodebytes(pickle.dumps(obj)).decode()
+
+
+def pickle_loads(s):
+    return pickle.loads(base64.decodebytes(s.encode()))
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("library_size", [1000, 10000])
+@pytest.mark.parametrize("dumps, loads", [
+    pytest.param(pickle_dumps, pickle_loads, id="pickle_base64"),
+    pytest.param(serialization.dumps, serialization.loads, id="versioned_json"),
+])
+def test_serialization(library_size, dumps, loads, request):
+    entry = CacheEntry([
+        psn_client.GameRecord(f"CUSA{index:05d}_00", f"Game {index}") for index in range(library_size)
+    ], 1600000000)
+    rounds = 10
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        serialized = dumps(entry)
+    dumps_time = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        loaded = loads(serialized)
+    loads_time = (time.perf_counter() - start) / rounds
+
+    assert loaded == entry
+    write_report({
+        "name": request.node.name,
+        "library_size": library_size,
+        "bytes": len(serialized),
+        "dumps_time": round(dumps_time, 6),
+        "loads_time": round(loads_time, 6),
+    })
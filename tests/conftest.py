@@ -1,9 +1,14 @@
+import asyncio
+
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from galaxy.unittest.mock import async_return_value
 
 from plugin import PSNClient, PSNPlugin
 from unittest.mock import MagicMock, Mock
 from http_client import HttpClient
+from retry import RetryPolicy
 from tests.async_mock import AsyncMock
 
 
@@ -55,6 +60,11 @@ def user_profile(online_id, account_id):
     }
 
 
+@pytest.fixture(autouse=True)
+def no_preconnect(mocker):
+    mocker.patch("plugin.PSNPlugin.PRECONNECT", False)
+
+
 @pytest.fixture()
 def http_get(mocker):
     return mocker.patch(
@@ -108,3 +118,47 @@ def create_plugin(mocker, mock_psn_client):
         async with PSNPlugin(MagicMock(), MagicMock(), None) as plugin:
             return plugin
     return inner
+
+
+@pytest.fixture()
+async def body_server():
+    """Serves JSON, failing while sending the body of the first `failures` responses"""
+    class Server:
+        failures = 1
+        requests = 0
+        truncate = False
+        # seconds between parts of a successful body
+        delay = 0
+
+    async def handler(request):
+        Server.requests += 1
+        response = web.StreamResponse(headers={"Content-Length": "11", "Content-Type": "application/json"})
+        await response.prepare(request)
+        if Server.requests <= Server.failures:
+            await response.write(b'{"da')
+            if Server.truncate:
+                request.transport.close()
+                return response
+            await asyncio.sleep(0.3)
+        else:
+            await response.write(b'{"data"')
+            await asyncio.sleep(Server.delay)
+            await response.write(b': 1}')
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    server = TestServer(app)
+    await server.start_server()
+    Server.url = str(server.make_url("/"))
+    yield Server
+    await server.close()
+
+
+@pytest.fixture()
+async def fast_retrying_client(mocker):
+    mocker.patch("http_client.READ_TIMEOUT", 0.1)
+    client = HttpClient(RetryPolicy(base_delay=0))
+    yield client
+    await client.close()
@@ -2,8 +2,11 @@ import os
 import json
 import subprocess
 import socket
+import time
 
 TIMEOUT = 5
+# seconds from spawning the plugin process to its answer to get_capabilities
+STARTUP_BUDGET = float(os.environ.get("PSN_STARTUP_BUDGET", 1.5))
 
 import pytest
 
@@ -33,6 +36,7 @@ def test_integration():
     }
     token = "token"
     server = TCPServer()
+    start = time.perf_counter()
     result = subprocess.Popen(
         ["python", plugin_path, token, str(server.port), "plugin.log"]
     )
@@ -41,7 +45,9 @@ def test_integration():
     plugin_socket.settimeout(TIMEOUT)
     plugin_socket.sendall((json.dumps(request)+"\n").encode("utf-8"))
     response = json.loads(plugin_socket.recv(4096))
+    startup_time = time.perf_counter() - start
     print(response)
+    print(f"startup time: {startup_time:.3f}s")
     assert response["result"]["platform_name"] == "psn"
     assert set(response["result"]["features"]) == set([
                 'ImportOwnedGames',
@@ -49,6 +55,7 @@ def test_integration():
                 'ImportSubscriptionGames',
             ])
     assert response["result"]["token"] == token
+    assert startup_time < STARTUP_BUDGET, f"Startup took {startup_time:.3f}s, budget is {STARTUP_BUDGET}s"
 
     plugin_socket.close()
     result.wait(TIMEOUT)
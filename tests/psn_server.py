@@ -0,0 +1,164 @@
+"""Local stand-in of PSN endpoints used by the plugin, for benchmarks.
+
+Server runs in a separate process so it does not affect measured CPU time and memory of the plugin.
+"""
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+from collections import Counter
+from dataclasses import asdict, dataclass
+
+from aiohttp import web
+
+GRAPHQL_PATH = "/api/graphql/v1/op"
+SIGNIN_PATH = "/api/session/v1/signin"
+SUBSCRIPTIONS_PATH = "/subscriptions"
+STATS_PATH = "/_stats"
+
+PRODUCTION_HOSTS = ["https://web.np.playstation.com", "https://store.playstation.com"]
+
+
+@dataclass
+class ServerConfig:
+    library_size: int = 1000
+    played_size: int = 100
+    subscription_games: int = 20
+    latency: float = 0.0
+    error_rate: float = 0.0
+    max_page_size: int = 500
+    seed: int = 0
+
+
+def _game(index):
+    # real responses carry many more fields than the plugin uses, they are emulated by padding
+    return {
+        "__typename": "GameLibraryTitle",
+        "titleId": f"CUSA{index:05d}_00",
+        "name": f"Game {index}",
+        "conceptId": str(index),
+        "entitlementId": f"EP0000-CUSA{index:05d}_00-GAME{index:016d}",
+        "image": {"__typename": "Media", "url": f"https://image.api.playstation.com/{index}/{'x' * 80}.png"},
+        "isActive": True,
+        "isDownloadable": True,
+        "isPreOrder": False,
+        "membership": "NONE",
+        "platform": "PS4",
+        "productId": f"EP0000-CUSA{index:05d}_00-GAME{index:016d}",
+    }
+
+
+def _subscriptions_page(games):
+    tiles = "".join(
+        '<li><a class="ems-sdk-product-tile-link" data-telemetry-meta="{}"></a></li>'.format(
+            json.dumps({"id": str(index), "index": index, "name": f"PS Plus Game {index}",
+                        "titleId": f"CUSA9{index:04d}_00"}).replace('"', "&quot;")
+        )
+        for index in range(games)
+    )
+    filler = '<div class="psw-c-bg-card-1"><p class="psw-m-b-xs">store content</p></div>' * 2000
+    return f'<html><body>{filler}<ul class="psw-strand-scroller psw-grid-x">{tiles}</ul>{filler}</body></html>'
+
+
+class _Backend:
+    def __init__(self, config: ServerConfig):
+        self._config = config
+        self._random = random.Random(config.seed)
+        self._games = [_game(index) for index in range(config.library_size)]
+        self._subscriptions_page = _subscriptions_page(config.subscription_games)
+        self._stats = Counter()
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        if request.path == STATS_PATH:
+            return await handler(request)
+        operation = request.query.get("operationName", request.path)
+        self._stats[operation] += 1
+        self._stats["requests"] += 1
+        if self._config.latency:
+            await asyncio.sleep(self._config.latency)
+        if self._random.random() < self._config.error_rate:
+            self._stats["errors"] += 1
+            if self._random.random() < 0.5:
+                raise web.HTTPTooManyRequests(headers={"Retry-After": "0"})
+            raise web.HTTPServiceUnavailable()
+        response = await handler(request)
+        self._stats["bytes"] += response.content_length or 0
+        return response
+
+    async def graphql(self, request):
+        operation = request.query.get("operationName")
+        variables = json.loads(request.query.get("variables", "{}"))
+        if operation == "getPurchasedGameList":
+            start = int(variables.get("start", 0))
+            size = min(int(variables.get("size", 100)), self._config.max_page_size)
+            return self._page("purchasedTitlesRetrieve", self._games, start, size)
+        if operation == "getUserGameList":
+            start = int(variables.get("offset", 0))
+            size = min(int(variables.get("limit", 100)), 100)
+            return self._page("gameLibraryTitlesRetrieve", self._games[:self._config.played_size], start, size)
+        if operation == "getProfileOracle":
+            return web.json_response({"data": {"oracleUserProfileRetrieve": {
+                "accountId": "1234567890", "onlineId": "benchmark", "isPsPlusMember": True
+            }}})
+        raise web.HTTPBadRequest()
+
+    @staticmethod
+    def _page(operation, games, start, size):
+        page = games[start:start + size]
+        return web.json_response({"data": {operation: {"games": page, "pageInfo": {
+            "totalCount": len(games), "start": start, "offset": start, "size": len(page),
+            "isLast": start + size >= len(games)
+        }}}})
+
+    async def signin(self, request):
+        response = web.Response(text="<html></html>", content_type="text/html")
+        response.set_cookie("npsso", "benchmark")
+        return response
+
+    async def subscriptions(self, request):
+        return web.Response(text=self._subscriptions_page, content_type="text/html")
+
+    async def stats(self, request):
+        if request.method == "DELETE":
+            self._stats.clear()
+        return web.json_response(dict(self._stats))
+
+
+def _serve(config, sock):
+    backend = _Backend(config)
+    app = web.Application(middlewares=[backend.middleware])
+    app.router.add_get(GRAPHQL_PATH, backend.graphql)
+    app.router.add_get(SIGNIN_PATH, backend.signin)
+    app.router.add_get(SUBSCRIPTIONS_PATH, backend.subscriptions)
+    app.router.add_route("*", STATS_PATH, backend.stats)
+    web.run_app(app, sock=sock, print=None, handle_signals=False)
+
+
+class PSNStandInServer:
+    def __init__(self, config: ServerConfig):
+        self.config = config
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(("127.0.0.1", 0))
+        # connections are queued until the server process starts accepting them
+        self._socket.listen(128)
+        self.url = "http://127.0.0.1:{}".format(self._socket.getsockname()[1])
+        self._process = multiprocessing.Process(target=_serve, args=(config, self._socket), daemon=True)
+
+    def __enter__(self):
+        self._process.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join()
+        self._socket.close()
+
+    def redirect(self, url: str) -> str:
+        for host in PRODUCTION_HOSTS:
+            url = url.replace(host, self.url)
+        return url
+
+    def describe(self):
+        return asdict(self.config)
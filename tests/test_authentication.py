@@ -1,3 +1,4 @@
+import asyncio
 from unittest.mock import MagicMock
 
 import pytest
@@ -7,6 +8,7 @@ from galaxy.unittest.mock import async_return_value
 from http_client import CookieJar
 from plugin import AUTH_PARAMS
 from psn_client import USER_INFO_URL
+from tests.async_mock import AsyncMock
 
 
 @pytest.fixture()
@@ -66,6 +68,41 @@ async def test_credentials_to_store_after_refresh_cookies(
     # Because of mocked `refresh_cookies` method, this test has to manually trigger `update_cookies`.
     # In real code this method is triggered by `aiohttp.ClientSession._request` during preparing response.
     cookie_jar.update_cookies(new_credentials_to_store['cookies'])
+    # cookies updates are stored in batches
+    plugin._credentials_writer.flush()
 
     refresh_cookies.assert_called_once()
     plugin.store_credentials.assert_called_with(new_credentials_to_store)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_credentials_are_not_stored_again(
+    http_get,
+    psn_plugin,
+    stored_credentials,
+    user_profile,
+):
+    http_get.return_value = user_profile
+    psn_plugin.store_credentials = MagicMock()
+
+    await psn_plugin.authenticate(stored_credentials)
+    psn_plugin._credentials_writer.flush()
+
+    psn_plugin.store_credentials.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_preconnect_while_authenticating(
+    http_get,
+    psn_plugin,
+    stored_credentials,
+    user_profile,
+    mocker,
+):
+    mocker.patch("plugin.PSNPlugin.PRECONNECT", True)
+    preconnect = mocker.patch("plugin.HttpClient.preconnect", new_callable=AsyncMock)
+    http_get.return_value = user_profile
+    await psn_plugin.authenticate(stored_credentials)
+    await asyncio.sleep(0)
+
+    preconnect.assert_called_once_with()
@@ -0,0 +1,119 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from cache import Cache
+
+
+def test_newer_value_wins():
+    cache = Cache()
+    cache.update("key", "new", 20)
+    cache.update("key", "old", 10)
+
+    assert cache.get("key", 15) == "new"
+    assert cache.get("key", 30) is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = Cache(max_entries=2)
+    cache.update("a", 1, 0)
+    cache.update("b", 2, 0)
+    cache.get("a")
+    cache.update("c", 3, 0)
+
+    assert dict(cache) == {"a": 1, "c": 3}
+    assert cache.stats.evictions == 1
+
+
+def test_size_is_bounded():
+    cache = Cache(max_size=10, sizeof=len)
+    cache.update("a", "x" * 6, 0)
+    cache.update("b", "x" * 6, 0)
+
+    assert dict(cache) == {"b": "x" * 6}
+    assert cache.size == 6
+
+
+def test_size_given_by_caller():
+    cache = Cache(max_size=10)
+    cache.update("a", {"large": "payload"}, 0, size=6)
+    cache.update("b", {"unknown": "size"}, 0)
+    cache.update("c", {"other": "payload"}, 0, size=6)
+
+    assert dict(cache) == {"b": {"unknown": "size"}, "c": {"other": "payload"}}
+    assert cache.size == 6
+
+
+def test_remove_and_clear():
+    cache = Cache(sizeof=len)
+    cache.update("a", "x", 0)
+    cache.update("b", "yy", 0)
+
+    cache.remove("a")
+    cache.remove("missing")
+    assert dict(cache) == {"b": "yy"}
+    assert cache.size == 2
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_entry_expires():
+    cache = Cache(ttl=10)
+    with patch("cache.time.monotonic", return_value=100):
+        cache.update("a", 1, 0)
+        cache.update("b", 2, 0, ttl=30)
+    with patch("cache.time.monotonic", return_value=120):
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        # expired entry is replaced regardless of its timestamp
+        cache.update("a", 3, 0)
+        assert cache.get("a") == 3
+
+    assert cache.stats.expirations == 1
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_runs_once():
+    cache = Cache(ttl=10)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        return "value"
+
+    assert await asyncio.gather(*[cache.get_or_compute("key", compute) for _ in range(3)]) == ["value"] * 3
+    assert await cache.get_or_compute("key", compute) == "value"
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_computation_is_not_cached():
+    cache = Cache(ttl=10)
+
+    async def fail():
+        raise ValueError()
+
+    async def compute():
+        return "value"
+
+    with pytest.raises(ValueError):
+        await cache.get_or_compute("key", fail)
+    assert await cache.get_or_compute("key", compute) == "value"
+
+
+@pytest.mark.asyncio
+async def test_no_caching_with_zero_ttl():
+    cache = Cache(ttl=0)
+
+    async def compute():
+        return "value"
+
+    await cache.get_or_compute("key", compute)
+    assert len(cache) == 0
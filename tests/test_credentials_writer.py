@@ -0,0 +1,73 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from credentials_writer import CredentialsWriter
+
+
+@pytest.fixture()
+def store():
+    return MagicMock()
+
+
+@pytest.fixture()
+def writer(store):
+    return CredentialsWriter(store, delay=0.01)
+
+
+def test_write_skips_unchanged(writer, store):
+    writer.write({"cookies": {"npsso": "a"}})
+    writer.write({"cookies": {"npsso": "a"}})
+
+    store.assert_called_once_with({"cookies": {"npsso": "a"}})
+
+
+@pytest.mark.asyncio
+async def test_schedule_coalesces_changes(writer, store):
+    writer.schedule({"cookies": {"npsso": "a"}})
+    writer.schedule({"cookies": {"npsso": "b"}})
+    writer.schedule({"cookies": {"npsso": "c"}})
+    store.assert_not_called()
+
+    await asyncio.sleep(0.05)
+
+    store.assert_called_once_with({"cookies": {"npsso": "c"}})
+
+
+@pytest.mark.asyncio
+async def test_schedule_back_to_stored_value_cancels_write(writer, store):
+    writer.write({"cookies": {"npsso": "a"}})
+    writer.schedule({"cookies": {"npsso": "b"}})
+    writer.schedule({"cookies": {"npsso": "a"}})
+
+    await asyncio.sleep(0.05)
+
+    store.assert_called_once_with({"cookies": {"npsso": "a"}})
+
+
+@pytest.mark.asyncio
+async def test_flush_stores_pending(writer, store):
+    writer.schedule({"cookies": {"npsso": "a"}})
+    writer.flush()
+    store.assert_called_once_with({"cookies": {"npsso": "a"}})
+
+    await asyncio.sleep(0.05)
+    store.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_stored_value_is_not_aliased(writer, store):
+    credentials = {"cookies": {"npsso": "a"}}
+    writer.write(credentials)
+    credentials["cookies"]["npsso"] = "b"
+    writer.write(credentials)
+
+    assert store.call_count == 2
+
+
+def test_seeded_credentials_are_not_stored(writer, store):
+    writer.seed({"cookies": {"npsso": "a"}})
+    writer.write({"cookies": {"npsso": "a"}})
+
+    store.assert_not_called()
@@ -1,6 +1,8 @@
 from galaxy.api.consts import LicenseType
 from galaxy.api.types import Game, LicenseInfo, SubscriptionGame
 
+from psn_client import GameRecord
+
 COMMUNICATION_ID = "NPWR11556_00"
 
 DEFAULT_LICENSE = LicenseInfo(LicenseType.SinglePurchase, None)
@@ -25,23 +27,23 @@ DLCS = [
 TITLES = GAMES + DLCS
 
 PARSED_GAME_TITLES = [
-    {"titleId": "CUSA07917_00", "name": "Tooth and Tail"},
-    {"titleId": "CUSA02000_00", "name": "Batman: Return to Arkham - Arkham City"},
-    {"titleId": "CUSA05603_00", "name": "Batman"},
-    {"titleId": "CUSA01427_00", "name": "Game of Thrones"},
-    {"titleId": "CUSA01858_00", "name": "Grim Fandango Remastered"},
-    {"titleId": "CUSA06291_00", "name": "NARUTO SHIPPUDEN: Ultimate Ninja STORM TRILOGY"},
+    GameRecord("CUSA07917_00", "Tooth and Tail"),
+    GameRecord("CUSA02000_00", "Batman: Return to Arkham - Arkham City"),
+    GameRecord("CUSA05603_00", "Batman"),
+    GameRecord("CUSA01427_00", "Game of Thrones"),
+    GameRecord("CUSA01858_00", "Grim Fandango Remastered"),
+    GameRecord("CUSA06291_00", "NARUTO SHIPPUDEN: Ultimate Ninja STORM TRILOGY"),
     # shown as single item in the console
-    {"titleId": "CUSA00860_00", "name": "Tales from the Borderlands"},
-    {"titleId": "CUSA07320_00", "name": "Horizon Zero Dawnâ„¢"},
-    {"titleId": "CUSA07140_00", "name": "Dreamfall Chapters"},
-    {"titleId": "CUSA08487_00", "name": "Life is Strange: Before the Storm"},
+    GameRecord("CUSA00860_00", "Tales from the Borderlands"),
+    GameRecord("CUSA07320_00", "Horizon Zero Dawnâ„¢"),
+    GameRecord("CUSA07140_00", "Dreamfall Chapters"),
+    GameRecord("CUSA08487_00", "Life is Strange: Before the Storm"),
 ]
 
 BACKEND_GAME_TITLES = {
     "data": {
         "purchasedTitlesRetrieve": {
-            "games": PARSED_GAME_TITLES,
+            "games": [{"titleId": game.title_id, "name": game.name} for game in PARSED_GAME_TITLES],
             "pageInfo": {
                 "start": 0,
                 "size": 11,
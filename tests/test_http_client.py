@@ -0,0 +1,307 @@
+import json
+import logging
+
+import aiohttp
+import pytest
+from aioresponses import aioresponses
+from galaxy.api.errors import AuthenticationRequired, BackendError, BackendNotAvailable, BackendTimeout, \
+    TooManyRequests, UnknownBackendResponse
+from galaxy.unittest.mock import async_return_value
+
+from http_client import HttpClient, operation_name
+from retry import DEFAULT_MAX_ATTEMPTS, RetryPolicy
+
+URL = "https://web.np.playstation.com/api/graphql/v1/op"
+
+
+@pytest.fixture()
+async def http_client():
+    client = HttpClient()
+    yield client
+    await client.close()
+
+
+@pytest.fixture()
+def backend():
+    with aioresponses() as mocked:
+        yield mocked
+
+
+def request_headers(backend, index):
+    return list(backend.requests.values())[0][index].kwargs.get("headers") or {}
+
+
+@pytest.mark.asyncio
+async def test_not_modified_response_returns_cached_data(http_client, backend):
+    backend.get(URL, payload={"data": 1}, headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Mar 2021 10:00:00 GMT"})
+    backend.get(URL, status=304)
+
+    assert await http_client.get(URL) == {"data": 1}
+    assert await http_client.get(URL) == {"data": 1}
+    assert request_headers(backend, 0) == {}
+    assert request_headers(backend, 1) == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Mar 2021 10:00:00 GMT"
+    }
+
+
+@pytest.mark.asyncio
+async def test_modified_response_replaces_cached_data(http_client, backend):
+    backend.get(URL, payload={"data": 1}, headers={"ETag": '"v1"'})
+    backend.get(URL, payload={"data": 2}, headers={"ETag": '"v2"'})
+    backend.get(URL, status=304)
+
+    assert await http_client.get(URL) == {"data": 1}
+    assert await http_client.get(URL) == {"data": 2}
+    assert await http_client.get(URL) == {"data": 2}
+    assert request_headers(backend, 2) == {"If-None-Match": '"v2"'}
+
+
+@pytest.mark.asyncio
+async def test_validated_responses_are_bounded(backend, mocker):
+    mocker.patch("http_client.VALIDATED_RESPONSES_MAX_ENTRIES", 2)
+    mocker.patch("http_client.VALIDATED_RESPONSES_MAX_SIZE", 1024)
+    client = HttpClient()
+    urls = [f"{URL}?page={page}" for page in range(3)]
+    for page, url in enumerate(urls):
+        backend.get(url, payload={"data": page}, headers={"ETag": f'"{page}"'})
+        await client.get(url)
+    backend.get(urls[0], payload={"data": 0})
+
+    await client.get(urls[0])
+    await client.close()
+
+    # the least recently validated response was dropped
+    assert request_headers(backend, 1) == {}
+    assert len(client._validated_responses) == 2
+
+
+@pytest.mark.asyncio
+async def test_validated_responses_are_bounded_by_size(backend, mocker):
+    mocker.patch("http_client.VALIDATED_RESPONSES_MAX_SIZE", 100)
+    client = HttpClient()
+    backend.get(URL, body="x" * 101, headers={"ETag": '"v1"'})
+
+    await client.get(URL, get_json=False)
+    await client.close()
+
+    assert len(client._validated_responses) == 0
+
+
+@pytest.mark.asyncio
+async def test_no_validators_no_conditional_request(http_client, backend):
+    backend.get(URL, body="page")
+    backend.get(URL, body="page")
+
+    assert await http_client.get(URL, get_json=False) == "page"
+    assert await http_client.get(URL, get_json=False) == "page"
+    assert request_headers(backend, 1) == {}
+
+
+@pytest.mark.asyncio
+async def test_json_response(http_client, backend):
+    backend.get(URL, body='{"data": {"name": "Tooth and Tail™"}}', content_type="text/plain")
+
+    assert await http_client.get(URL) == {"data": {"name": "Tooth and Tail™"}}
+
+
+@pytest.mark.asyncio
+async def test_json_response_with_stdlib_decoder(http_client, backend, mocker):
+    mocker.patch("http_client.json_loads", json.loads)
+    backend.get(URL, payload={"data": [1, 2]})
+
+    assert await http_client.get(URL) == {"data": [1, 2]}
+
+
+@pytest.mark.asyncio
+async def test_empty_json_response(http_client, backend):
+    backend.get(URL, body=" ")
+
+    assert await http_client.get(URL) is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_json_response(http_client, backend):
+    backend.get(URL, body="<html></html>")
+
+    with pytest.raises(UnknownBackendResponse):
+        await http_client.get(URL)
+
+
+@pytest.mark.asyncio
+async def test_text_response(http_client, backend):
+    backend.get(URL, body="Zażółć".encode("iso-8859-2"), content_type="text/html; charset=iso-8859-2")
+
+    assert await http_client.get(URL, get_json=False) == "Zażółć"
+
+
+@pytest.mark.asyncio
+async def test_response_logged_only_in_debug(http_client, backend, caplog):
+    backend.get(URL, payload={"data": 1})
+    backend.get(URL, payload={"data": 2})
+    backend.get(URL, payload={"data": 3})
+
+    caplog.set_level(logging.INFO)
+    await http_client.get(URL)
+    assert '{"data": 1}' not in caplog.text
+
+    caplog.set_level(logging.DEBUG)
+    await http_client.get(URL)
+    await http_client.get(URL, silent=True)
+    assert '{"data": 2}' in caplog.text
+    assert '{"data": 3}' not in caplog.text
+
+
+@pytest.fixture()
+def sleep(mocker):
+    return mocker.patch("http_client.asyncio.sleep", side_effect=lambda delay: async_return_value(None))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+async def test_transient_error_is_retried(http_client, backend, sleep, status):
+    backend.get(URL, status=status)
+    backend.get(URL, payload={"data": 1})
+
+    assert await http_client.get(URL) == {"data": 1}
+    sleep.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_connection_error_is_retried(http_client, backend, sleep):
+    backend.get(URL, exception=aiohttp.ServerDisconnectedError())
+    backend.get(URL, payload={"data": 1})
+
+    assert await http_client.get(URL) == {"data": 1}
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_respected(http_client, backend, sleep):
+    backend.get(URL, status=429, headers={"Retry-After": "7"})
+    backend.get(URL, payload={"data": 1})
+
+    assert await http_client.get(URL) == {"data": 1}
+    assert sleep.call_args[0][0] >= 7
+
+
+@pytest.mark.asyncio
+async def test_too_long_retry_after_is_not_awaited(http_client, backend, sleep):
+    backend.get(URL, status=429, headers={"Retry-After": "3600"})
+
+    with pytest.raises(TooManyRequests):
+        await http_client.get(URL)
+    sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_attempts_are_limited(http_client, backend, sleep):
+    for _ in range(DEFAULT_MAX_ATTEMPTS):
+        backend.get(URL, status=500)
+
+    with pytest.raises(BackendError):
+        await http_client.get(URL)
+    assert sleep.call_count == DEFAULT_MAX_ATTEMPTS - 1
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_retried(http_client, backend, sleep):
+    backend.get(URL, status=401)
+
+    with pytest.raises(AuthenticationRequired):
+        await http_client.get(URL)
+    sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried(http_client, backend, sleep):
+    backend.post(URL, status=503)
+
+    with pytest.raises(BackendNotAvailable):
+        await http_client.post(URL)
+    sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("truncate", [False, True], ids=["slow body", "truncated body"])
+async def test_failed_body_transfer_is_retried(body_server, fast_retrying_client, truncate):
+    body_server.truncate = truncate
+
+    assert await fast_retrying_client.get(body_server.url) == {"data": 1}
+    assert body_server.requests == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("truncate, error", [
+    pytest.param(False, BackendTimeout, id="slow body"),
+    pytest.param(True, BackendError, id="truncated body"),
+])
+async def test_failed_body_transfer_is_translated(body_server, fast_retrying_client, truncate, error):
+    body_server.truncate = truncate
+    body_server.failures = DEFAULT_MAX_ATTEMPTS
+
+    with pytest.raises(error):
+        await fast_retrying_client.get(body_server.url)
+    assert body_server.requests == DEFAULT_MAX_ATTEMPTS
+
+
+@pytest.mark.asyncio
+async def test_metrics_include_body_transfer(body_server, fast_retrying_client):
+    body_server.truncate = True
+    body_server.delay = 0.05
+
+    await fast_retrying_client.get(body_server.url)
+
+    metrics = fast_retrying_client.metrics.snapshot()["/"]
+    assert metrics["statuses"] == {"ClientPayloadError": 1, "200": 1}
+    assert metrics["max"] >= 50
+
+
+@pytest.mark.asyncio
+async def test_invalid_body_is_counted_as_error(http_client, backend):
+    backend.get(URL, body="<html></html>")
+
+    with pytest.raises(UnknownBackendResponse):
+        await http_client.get(URL)
+    assert http_client.metrics.snapshot()["/api/graphql/v1/op"]["statuses"] == {"UnknownBackendResponse": 1}
+
+
+def test_retry_budget_per_operation():
+    policy = RetryPolicy(max_attempts=10, budget=2)
+    error = aiohttp.ServerDisconnectedError()
+
+    assert policy.retry_delay("GET", "getPurchasedGameList", 1, error) is not None
+    assert policy.retry_delay("GET", "getPurchasedGameList", 1, error) is not None
+    assert policy.retry_delay("GET", "getPurchasedGameList", 1, error) is None
+    assert policy.retry_delay("GET", "getUserGameList", 1, error) is not None
+
+
+@pytest.mark.parametrize("url, operation", [
+    ("https://web.np.playstation.com/api/graphql/v1/op?operationName=getProfileOracle&variables={}", "getProfileOracle"),
+    ("https://store.playstation.com/subscriptions", "/subscriptions"),
+])
+def test_operation_name(url, operation):
+    assert operation_name(url) == operation
+
+
+@pytest.mark.asyncio
+async def test_requests_metrics(http_client, backend, sleep):
+    url = URL + "?operationName=getPurchasedGameList"
+    backend.get(url, status=503)
+    backend.get(url, body='{"data": 1}')
+
+    await http_client.get(url)
+
+    metrics = http_client.metrics.snapshot()["getPurchasedGameList"]
+    assert metrics["requests"] == 2
+    assert metrics["statuses"] == {"503": 1, "200": 1}
+    assert metrics["bytes"] == len('{"data": 1}')
+    assert metrics["p99"] is not None
+
+
+@pytest.mark.asyncio
+async def test_preconnect(http_client, backend):
+    backend.head("https://web.np.playstation.com/", status=404)
+    backend.head("https://store.playstation.com/", exception=aiohttp.ClientConnectionError())
+
+    await http_client.preconnect(["https://web.np.playstation.com/", "https://store.playstation.com/"])
+    assert len(backend.requests) == 2
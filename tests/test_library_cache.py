@@ -0,0 +1,122 @@
+from unittest.mock import MagicMock
+
+import pytest
+from galaxy.api.types import Subscription
+
+from library_cache import LibraryCache, now, PAGE_SIZES, PURCHASED_GAMES_FINGERPRINT, PLAYED_GAMES, PSPLUS_STATUS, PURCHASED_GAMES, SUBSCRIPTION_GAMES
+from plugin import PSNPlugin
+from subscription_catalog import SubscriptionCatalog
+from tests.test_data import GAMES, PARSED_GAME_TITLES, SUBSCRIPTION_GAMES as SUBSCRIPTION_GAMES_LIST
+
+
+def test_update_and_get():
+    persistent_cache = {}
+    cache = LibraryCache(persistent_cache)
+    cache.update(PLAYED_GAMES, PARSED_GAME_TITLES)
+
+    assert cache.get(PLAYED_GAMES) == PARSED_GAME_TITLES
+    assert PLAYED_GAMES in persistent_cache
+
+
+def test_load_from_persistent_cache():
+    persistent_cache = {}
+    LibraryCache(persistent_cache).update(PSPLUS_STATUS, True)
+
+    assert LibraryCache(persistent_cache).get(PSPLUS_STATUS) is True
+
+
+def test_expired_entry():
+    cache = LibraryCache({})
+    cache.update(PSPLUS_STATUS, False, timestamp=1000)
+
+    assert cache.get(PSPLUS_STATUS) is None
+    assert cache.get_stale(PSPLUS_STATUS) is False
+
+
+def test_touched_entry_is_fresh_in_memory_only():
+    persistent_cache = {}
+    cache = LibraryCache(persistent_cache)
+    cache.update(PSPLUS_STATUS, False, timestamp=1000)
+    stored = dict(persistent_cache)
+
+    cache.touch(PSPLUS_STATUS)
+
+    assert cache.get(PSPLUS_STATUS) is False
+    assert persistent_cache == stored
+
+
+def test_corrupted_entry_is_skipped():
+    cache = LibraryCache({PURCHASED_GAMES: "corrupted", "credentials": {"cookies": {}}})
+
+    assert cache.get_stale(PURCHASED_GAMES) is None
+
+
+def test_games_in_outdated_format_are_dropped():
+    persistent_cache = {}
+    LibraryCache(persistent_cache).update(PURCHASED_GAMES, [{"titleId": "CUSA07917_00", "name": "Tooth and Tail"}])
+
+    assert LibraryCache(persistent_cache).get_stale(PURCHASED_GAMES) is None
+
+
+def test_value_over_budget_is_kept_in_memory_only():
+    persistent_cache = {}
+    cache = LibraryCache(persistent_cache, budgets={PLAYED_GAMES: 100})
+    cache.update(PLAYED_GAMES, PARSED_GAME_TITLES)
+
+    assert cache.get(PLAYED_GAMES) == PARSED_GAME_TITLES
+    assert PLAYED_GAMES not in persistent_cache
+    assert cache.stats.rejected == 1
+
+
+def test_least_valuable_values_are_evicted_over_total_budget():
+    persistent_cache = {}
+    cache = LibraryCache(persistent_cache, total_budget=700)
+    cache.update(PURCHASED_GAMES, PARSED_GAME_TITLES)
+    cache.update(PURCHASED_GAMES_FINGERPRINT, "10:CUSA07917_00")
+    cache.update(PLAYED_GAMES, PARSED_GAME_TITLES)
+
+    assert set(persistent_cache) == {PURCHASED_GAMES, PURCHASED_GAMES_FINGERPRINT}
+    assert cache.stats.evicted == 1
+    assert cache.stats.writes == 3
+    assert cache.stats.stored_size <= cache.stats.raw_size
+
+
+def test_unknown_key():
+    with pytest.raises(KeyError):
+        LibraryCache({}).update("unknown", 1)
+
+
+@pytest.mark.asyncio
+async def test_restarted_plugin_answers_from_persistent_cache(mocker):
+    persistent_cache = {}
+    cache = LibraryCache(persistent_cache)
+    cache.update(PURCHASED_GAMES, PARSED_GAME_TITLES)
+    cache.update(PLAYED_GAMES, [])
+    cache.update(PSPLUS_STATUS, True)
+    cache.update(SUBSCRIPTION_GAMES, SubscriptionCatalog.create(SUBSCRIPTION_GAMES_LIST, now()))
+    http_get = mocker.patch("http_client.HttpClient.get")
+
+    plugin = PSNPlugin(MagicMock(), MagicMock(), None)
+    plugin._persistent_cache = persistent_cache
+    plugin.handshake_complete()
+
+    assert await plugin.get_owned_games() == GAMES
+    assert await plugin.get_subscriptions() == [
+        Subscription(subscription_name="PlayStation PLUS", end_time=None, owned=True)
+    ]
+    assert [games async for games in plugin.get_subscription_games("PlayStation PLUS", None)] == [
+        SUBSCRIPTION_GAMES_LIST
+    ]
+    http_get.assert_not_called()
+    await plugin.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_learned_page_sizes_are_restored(psn_plugin):
+    persistent_cache = {}
+    psn_plugin._persistent_cache = persistent_cache
+    LibraryCache(persistent_cache).update(PAGE_SIZES, {"sizes": {"purchasedTitlesRetrieve": 400}, "limits": {}})
+
+    psn_plugin.handshake_complete()
+
+    assert psn_plugin._psn_client.page_sizes.page_size("purchasedTitlesRetrieve", 100, 1000) == 400
@@ -0,0 +1,101 @@
+import pytest
+from galaxy.api.consts import LicenseType
+from galaxy.api.types import Game, LicenseInfo
+from galaxy.unittest.mock import async_return_value
+
+from plugin import OWNED_GAMES
+from psn_client import GameRecord
+
+
+def game(title_id, name):
+    return Game(title_id, name, [], LicenseInfo(LicenseType.SinglePurchase, None))
+
+
+@pytest.fixture()
+def notifications(authenticated_plugin, mocker):
+    for name in ("add_game", "remove_game", "update_game"):
+        mocker.patch.object(authenticated_plugin, name)
+    return authenticated_plugin
+
+
+@pytest.fixture()
+def library(mocker):
+    library = {
+        "fingerprint": ["2:B"],
+        "purchased": [[GameRecord("A", "Alpha"), GameRecord("B", "Beta")]],
+        "played": [[GameRecord("C", "Gamma")]],
+    }
+    mocks = {
+        "fingerprint": "async_get_purchased_games_fingerprint",
+        "purchased": "async_get_purchased_games",
+        "played": "async_get_played_games",
+    }
+    return {
+        key: mocker.patch(
+            f"psn_client.PSNClient.{method}",
+            side_effect=lambda key=key: async_return_value(library[key][-1])
+        ) for key, method in mocks.items()
+    }, library
+
+
+async def sync(plugin):
+    plugin._scheduler.jobs[OWNED_GAMES].next_run = 0
+    plugin.tick()
+    await plugin._scheduler.jobs[OWNED_GAMES].task
+
+
+@pytest.mark.asyncio
+async def test_no_sync_before_import(notifications, library):
+    mocks, _ = library
+    notifications.tick()
+
+    assert OWNED_GAMES not in notifications._scheduler.jobs
+    mocks["fingerprint"].assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_sync_is_not_started_before_interval(notifications, library):
+    await notifications.get_owned_games()
+    notifications.tick()
+
+    assert notifications._scheduler.jobs[OWNED_GAMES].task is None
+
+
+@pytest.mark.asyncio
+async def test_unchanged_library_is_not_notified(notifications, library, mocker):
+    mocks, _ = library
+    await notifications.get_owned_games()
+    push_cache = mocker.patch.object(notifications, "push_cache")
+
+    await sync(notifications)
+
+    push_cache.assert_not_called()
+
+    assert mocks["fingerprint"].call_count == 2
+    mocks["purchased"].assert_called_once()
+    notifications.add_game.assert_not_called()
+    notifications.remove_game.assert_not_called()
+    notifications.update_game.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_changes_are_notified(notifications, library):
+    _, data = library
+    await notifications.get_owned_games()
+    data["fingerprint"].append("2:D")
+    data["purchased"].append([GameRecord("B", "Beta 2"), GameRecord("D", "Delta")])
+
+    await sync(notifications)
+
+    notifications.add_game.assert_called_once_with(game("D", "Delta"))
+    notifications.remove_game.assert_called_once_with("A")
+    notifications.update_game.assert_called_once_with(game("B", "Beta 2"))
+
+    notifications.add_game.reset_mock()
+    notifications.remove_game.reset_mock()
+    notifications.update_game.reset_mock()
+    await sync(notifications)
+
+    notifications.add_game.assert_not_called()
+    notifications.remove_game.assert_not_called()
+    notifications.update_game.assert_not_called()
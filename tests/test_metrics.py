@@ -0,0 +1,57 @@
+import json
+import logging
+
+from metrics import HttpMetrics, LatencyHistogram
+
+
+def test_empty_histogram():
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram(buckets=(10, 100, 1000))
+    for latency in [5] * 50 + [50] * 45 + [500] * 4 + [2000]:
+        histogram.record(latency)
+
+    assert histogram.count == 100
+    assert histogram.percentile(50) == 10
+    assert histogram.percentile(95) == 100
+    assert histogram.percentile(99) == 1000
+    assert histogram.percentile(100) == 2000
+
+
+def test_percentile_not_above_max():
+    histogram = LatencyHistogram(buckets=(10, 100))
+    histogram.record(42)
+
+    assert histogram.percentile(50) == 42
+
+
+def test_metrics_per_operation():
+    metrics = HttpMetrics()
+    metrics.record_request("getPurchasedGameList", 200, 0.02)
+    metrics.record_request("getPurchasedGameList", 503, 0.2)
+    metrics.record_bytes("getPurchasedGameList", 1024)
+    metrics.record_request("/subscriptions", 200, 0.3)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["getPurchasedGameList"]["requests"] == 2
+    assert snapshot["getPurchasedGameList"]["statuses"] == {"200": 1, "503": 1}
+    assert snapshot["getPurchasedGameList"]["bytes"] == 1024
+    assert snapshot["/subscriptions"]["p50"] == 300
+    assert metrics.requests == 3
+
+
+def test_dump_if_due(caplog):
+    caplog.set_level(logging.INFO)
+    metrics = HttpMetrics(dump_interval=3600)
+    metrics.record_request("getProfileOracle", 200, 0.01)
+
+    metrics.dump_if_due()
+    assert not caplog.records
+
+    metrics.dump_interval = 0
+    metrics.dump_if_due()
+    assert len(caplog.records) == 1
+    logged = json.loads(caplog.records[0].getMessage().split(": ", 1)[1])
+    assert logged["getProfileOracle"]["requests"] == 1
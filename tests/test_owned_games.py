@@ -1,3 +1,4 @@
+import asyncio
 import copy
 
 import pytest
@@ -6,6 +7,7 @@ from galaxy.api.errors import UnknownBackendResponse
 from galaxy.api.types import Game, LicenseInfo
 from galaxy.unittest.mock import async_return_value
 
+from library_cache import PURCHASED_GAMES
 from tests.test_data import GAMES, BACKEND_GAME_TITLES, PARSED_GAME_TITLES
 
 
@@ -44,6 +46,10 @@ async def test_get_purchased_and_played_games(
     parsed_purchased_games_titles,
     parsed_played_games_titles,
 ):
+    mocker.patch(
+        "psn_client.PSNClient.async_get_purchased_games_fingerprint",
+        return_value=async_return_value("fingerprint")
+    )
     mocker.patch(
         "psn_client.PSNClient.async_get_purchased_games",
         return_value=async_return_value(parsed_purchased_games_titles)
@@ -97,9 +103,83 @@ async def test_fetch_200_purchased_games(
     r1, r2 = copy.deepcopy(response), copy.deepcopy(response)
     r1["data"]["purchasedTitlesRetrieve"]["games"] = purchased_games[:response_size]
     r2["data"]["purchasedTitlesRetrieve"]["games"] = purchased_games[response_size:]
-    http_get.side_effect = [r1, r2]
+    # the first request is a size-1 probe of the purchased games list
+    http_get.side_effect = [r1, r1, r2]
     expected_games = [
         Game(game["titleId"], game["name"], [], LicenseInfo(LicenseType.SinglePurchase, None)) for game in purchased_games
     ]
 
     assert await authenticated_plugin.get_owned_games() == expected_games
+
+
+@pytest.mark.asyncio
+async def test_unchanged_purchased_games_are_taken_from_cache(
+    authenticated_plugin,
+    mocker,
+):
+    mocker.patch(
+        "psn_client.PSNClient.async_get_purchased_games_fingerprint",
+        side_effect=lambda: async_return_value("10:CUSA07917_00")
+    )
+    purchased_games = mocker.patch(
+        "psn_client.PSNClient.async_get_purchased_games",
+        return_value=async_return_value(PARSED_GAME_TITLES)
+    )
+    mocker.patch(
+        "psn_client.PSNClient.async_get_played_games",
+        side_effect=lambda: async_return_value([])
+    )
+    authenticated_plugin._library_cache.ttls[PURCHASED_GAMES] = -1
+
+    assert await authenticated_plugin.get_owned_games() == GAMES
+    assert await authenticated_plugin.get_owned_games() == GAMES
+    purchased_games.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_changed_purchased_games_are_fetched(
+    authenticated_plugin,
+    mocker,
+):
+    mocker.patch(
+        "psn_client.PSNClient.async_get_purchased_games_fingerprint",
+        side_effect=[async_return_value("9:CUSA02000_00"), async_return_value("10:CUSA07917_00")]
+    )
+    mocker.patch(
+        "psn_client.PSNClient.async_get_purchased_games",
+        side_effect=[async_return_value(PARSED_GAME_TITLES[1:]), async_return_value(PARSED_GAME_TITLES)]
+    )
+    mocker.patch(
+        "psn_client.PSNClient.async_get_played_games",
+        side_effect=lambda: async_return_value([])
+    )
+    authenticated_plugin._library_cache.ttls[PURCHASED_GAMES] = -1
+
+    assert await authenticated_plugin.get_owned_games() == GAMES[1:]
+    assert await authenticated_plugin.get_owned_games() == GAMES
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_cancels_the_other_one(
+    authenticated_plugin,
+):
+    played_games_cancelled = asyncio.Event()
+
+    async def get_played_games():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            played_games_cancelled.set()
+            raise
+
+    async def get_purchased_games():
+        await asyncio.sleep(0)
+        raise UnknownBackendResponse()
+
+    authenticated_plugin._psn_client.async_get_purchased_games_fingerprint = get_purchased_games
+    authenticated_plugin._psn_client.async_get_purchased_games = get_purchased_games
+    authenticated_plugin._psn_client.async_get_played_games = get_played_games
+
+    with pytest.raises(UnknownBackendResponse):
+        await asyncio.wait_for(authenticated_plugin.get_owned_games(), 1)
+    assert played_games_cancelled.is_set()
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+from galaxy.api.errors import TooManyRequests, UnknownBackendResponse
+
+from pagination import ConcurrencyWindow, PageSizeAdvisor, next_page_offset
+
+
+@pytest.mark.asyncio
+async def test_window_grows_on_fast_pages():
+    window = ConcurrencyWindow(min_size=1, max_size=3, initial_size=1, target_latency=10)
+    for _ in range(5):
+        async with window.slot():
+            pass
+    assert window.size == 3
+
+
+@pytest.mark.asyncio
+async def test_window_shrinks_on_slow_pages():
+    window = ConcurrencyWindow(min_size=1, max_size=8, initial_size=8, target_latency=0)
+    async with window.slot():
+        await asyncio.sleep(0.01)
+    assert window.size == 4
+
+
+@pytest.mark.asyncio
+async def test_window_shrinks_on_throttling():
+    window = ConcurrencyWindow(min_size=2, max_size=8, initial_size=8)
+    for _ in range(3):
+        with pytest.raises(TooManyRequests):
+            async with window.slot():
+                raise TooManyRequests()
+    assert window.size == 2
+    assert window.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_window_limits_concurrency():
+    window = ConcurrencyWindow(min_size=2, max_size=2, initial_size=2)
+    running = []
+    max_running = 0
+
+    async def job():
+        nonlocal max_running
+        async with window.slot():
+            running.append(None)
+            max_running = max(max_running, len(running))
+            await asyncio.sleep(0)
+            running.pop()
+
+    await asyncio.gather(*[job() for _ in range(10)])
+    assert max_running == 2
+
+
+def test_invalid_window_limits():
+    with pytest.raises(ValueError):
+        ConcurrencyWindow(min_size=3, max_size=2)
+
+
+@pytest.mark.parametrize("page_info, expected", [
+    ({"isLast": True, "nextOffset": 20}, None),
+    ({"isLast": False}, 20),
+    ({"isLast": False, "nextOffset": 15}, 15),
+    ({"nextOffset": "15"}, 15),
+    ({}, None),
+])
+def test_next_page_offset(page_info, expected):
+    assert next_page_offset(page_info, 10, 10) == expected
+
+
+@pytest.mark.parametrize("page_info", [
+    {"isLast": False, "nextOffset": 10},
+    {"nextOffset": "bad"},
+    "bad",
+])
+def test_next_page_offset_invalid(page_info):
+    with pytest.raises(UnknownBackendResponse):
+        next_page_offset(page_info, 10, 10)
+
+
+def test_page_size_grows_on_fast_pages():
+    advisor = PageSizeAdvisor(target_latency=1, max_page_bytes=10 ** 9)
+    advisor.record("games", 100, 0.5, 1000)
+
+    assert advisor.page_size("games", 100, 1000) == 200
+    assert advisor.page_size("games", 100, 150) == 150
+
+
+def test_page_size_shrinks_on_slow_pages():
+    advisor = PageSizeAdvisor(min_size=10, target_latency=1, max_page_bytes=10 ** 9)
+    advisor.record("games", 100, 4, 1000)
+    assert advisor.page_size("games", 100, 1000) == 25
+
+    advisor.record_timeout("games", 25)
+    assert advisor.page_size("games", 100, 1000) == 12
+
+
+def test_page_size_is_bounded_by_payload():
+    advisor = PageSizeAdvisor(target_latency=1, max_page_bytes=150 * 1024)
+    advisor.record("games", 100, 0.1, 100 * 1024)
+
+    assert advisor.page_size("games", 100, 1000) == 150
+
+
+def test_page_size_is_limited_by_backend():
+    advisor = PageSizeAdvisor()
+    advisor.limit("games", 50)
+
+    assert advisor.page_size("games", 100, 1000) == 50
+    assert advisor.changed
+
+
+def test_page_sizes_snapshot():
+    advisor = PageSizeAdvisor(target_latency=1, max_page_bytes=10 ** 9)
+    advisor.record("games", 100, 0.5, 1000)
+    advisor.limit("played", 50)
+    snapshot = advisor.snapshot()
+    assert not advisor.changed
+
+    loaded = PageSizeAdvisor()
+    loaded.load(snapshot)
+    # 200 was not served yet
+    assert loaded.page_size("games", 100, 1000) == 100
+    assert loaded.page_size("played", 100, 1000) == 50
+
+
+def test_rejected_page_size_falls_back():
+    advisor = PageSizeAdvisor(target_latency=1, max_page_bytes=10 ** 9, limit_ttl=100, clock=lambda: 1000)
+    advisor.record("games", 100, 0.5, 1000)
+    advisor.record("games", 200, 0.5, 1000)
+
+    assert advisor.reject("games", 400, 100, deterministic=True) == 200
+    assert advisor.page_size("games", 100, 1000) == 200
+    assert advisor.reject("games", 200, 100, deterministic=True) == 100
+    assert advisor.page_size("games", 100, 1000) == 100
+    assert advisor.snapshot() == {"sizes": {}, "limits": {"games": [100, 1100]}}
+
+
+def test_transient_failure_does_not_limit_page_size():
+    advisor = PageSizeAdvisor(target_latency=1, max_page_bytes=10 ** 9)
+    advisor.record("games", 100, 0.5, 1000)
+
+    assert advisor.reject("games", 200, 100, deterministic=False) == 100
+    assert advisor.snapshot()["limits"] == {}
+    advisor.record("games", 100, 0.5, 1000)
+    assert advisor.page_size("games", 100, 1000) == 200
+
+
+def test_page_size_limit_expires():
+    now = [1000]
+    advisor = PageSizeAdvisor(limit_ttl=100, clock=lambda: now[0])
+    advisor.limit("games", 50)
+    assert advisor.page_size("games", 100, 1000) == 50
+
+    now[0] += 100
+    assert advisor.page_size("games", 100, 1000) == 100
+    assert advisor.snapshot()["limits"] == {}
+
+
+def test_limits_without_expiration_are_not_loaded():
+    advisor = PageSizeAdvisor()
+    advisor.load({"sizes": {}, "limits": {"games": 100}})
+
+    assert advisor.page_size("games", 1000, 1000) == 1000
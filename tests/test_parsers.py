@@ -1,8 +1,18 @@
+import os
+import subprocess
+import sys
+
 import pytest
 from galaxy.api.errors import UnknownBackendResponse
 from galaxy.api.types import SubscriptionGame
 
-from parsers import PSNGamesParser
+from parsers import BACKENDS, PSNGamesParser
+from tests.test_data import PSN_PLUS_MONTHLY_FREE_GAMES_HTML, SUBSCRIPTION_GAMES
+
+
+@pytest.fixture(params=[backend for backend in BACKENDS if backend.is_available()], ids=lambda backend: backend.name)
+def games_parser(request):
+    return PSNGamesParser(request.param())
 
 
 @pytest.mark.asyncio
@@ -79,8 +89,8 @@ from parsers import PSNGamesParser
         id="Japanese version"
     ),
 ])
-async def test_parse_subscription_games(http_response, expected_result):
-    parser = PSNGamesParser().parse(http_response)
+async def test_parse_subscription_games(games_parser, http_response, expected_result):
+    parser = games_parser.parse(http_response)
 
     assert parser == expected_result
 
@@ -91,6 +101,38 @@ async def test_parse_subscription_games(http_response, expected_result):
     pytest.param("psw-strand-scroller-WRONG_TAG"),
     pytest.param("<ul class=psw-strand-scroller-WRONG_TAG></div>"),
     ])
-async def test_parse_subscription_games_raise_lack_paginator_tag(http_response):
+async def test_parse_subscription_games_raise_lack_paginator_tag(games_parser, http_response):
     with pytest.raises(UnknownBackendResponse):
-        PSNGamesParser().parse(http_response)
+        games_parser.parse(http_response)
+
+
+def test_parse_store_page(games_parser):
+    assert games_parser.parse(PSN_PLUS_MONTHLY_FREE_GAMES_HTML) == SUBSCRIPTION_GAMES
+
+
+def test_only_first_paginator_is_parsed(games_parser):
+    http_response = (
+        '<ul class="psw-strand-scroller">'
+            "<a class=ems-sdk-product-tile-link data-telemetry-meta="
+            "'{\"name\":\"Firewall Zero Hour™\",\"titleId\":\"CUSA09831_00\"}'>"
+            "</a>"
+        '</ul>'
+        '<ul class="other psw-strand-scroller">'
+            "<a class=ems-sdk-product-tile-link data-telemetry-meta="
+            "'{\"name\":\"Firewall Zero Hour 2™\",\"titleId\":\"CUSA09831_01\"}'>"
+            "</a>"
+        '</ul>'
+    )
+    assert games_parser.parse(http_response) == [
+        SubscriptionGame(game_id="CUSA09831_00", game_title="Firewall Zero Hour™")
+    ]
+
+
+def test_default_parser_uses_fastest_available_backend():
+    assert isinstance(PSNGamesParser()._backend, next(backend for backend in BACKENDS if backend.is_available()))
+
+
+def test_plugin_import_does_not_load_bs4():
+    code = "import sys, plugin; sys.exit('bs4' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    assert subprocess.run([sys.executable, "-c", code], env=env).returncode == 0
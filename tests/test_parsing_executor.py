@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+from galaxy.api.errors import UnknownBackendResponse
+
+from http_client import HttpClient
+from parsing_executor import ParsingExecutor, PROCESS_POOL, THREAD_POOL
+from psn_client import PSNClient
+from tests.test_data import PSN_PLUS_MONTHLY_FREE_GAMES_HTML, SUBSCRIPTION_GAMES
+
+
+@pytest.fixture()
+async def create_psn_client():
+    http_client = HttpClient()
+    psn_clients = []
+
+    def inner(parsing_executor):
+        psn_client = PSNClient(http_client, parsing_executor=parsing_executor)
+        psn_clients.append(psn_client)
+        return psn_client
+
+    yield inner
+    for psn_client in psn_clients:
+        psn_client.close()
+    await http_client.close()
+
+
+def thread_parser(response):
+    return threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_small_payload_parsed_inline(http_get, create_psn_client):
+    http_get.return_value = "small"
+    psn_client = create_psn_client(ParsingExecutor(THREAD_POOL, inline_threshold=100))
+
+    assert await psn_client.fetch_data(thread_parser, "url") == threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_large_payload_parsed_in_executor(http_get, create_psn_client):
+    http_get.return_value = "large" * 100
+    psn_client = create_psn_client(ParsingExecutor(THREAD_POOL, inline_threshold=100))
+
+    assert await psn_client.fetch_data(thread_parser, "url") != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_parser_error_in_executor(http_get, create_psn_client):
+    def parser(response):
+        raise KeyError()
+
+    http_get.return_value = "large" * 100
+    psn_client = create_psn_client(ParsingExecutor(THREAD_POOL, inline_threshold=0))
+
+    with pytest.raises(UnknownBackendResponse):
+        await psn_client.fetch_data(parser, "url")
+
+
+@pytest.mark.asyncio
+async def test_subscription_games_parsed_in_process_pool(http_get, create_psn_client):
+    http_get.return_value = PSN_PLUS_MONTHLY_FREE_GAMES_HTML
+    psn_client = create_psn_client(ParsingExecutor(PROCESS_POOL, inline_threshold=0))
+
+    assert await psn_client.get_subscription_games() == SUBSCRIPTION_GAMES
+
+
+def test_unknown_executor_kind():
+    with pytest.raises(ValueError):
+        ParsingExecutor("unknown")
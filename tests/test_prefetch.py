@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from galaxy.api.errors import UnknownBackendResponse
+from galaxy.api.types import Subscription
+from galaxy.unittest.mock import async_return_value, async_raise
+
+from psn_client import PSNClient
+from tests.async_mock import AsyncMock
+from tests.test_data import GAMES, PARSED_GAME_TITLES, SUBSCRIPTION_GAMES
+
+
+@pytest.fixture()
+def psn_client_mocks(mocker, account_id, online_id):
+    mocker.patch.object(PSNClient, "async_get_own_user_info", return_value=(account_id, online_id), new_callable=AsyncMock)
+    return {
+        name: mocker.patch.object(PSNClient, name, side_effect=lambda result=result: async_return_value(result))
+        for name, result in [
+            ("async_get_purchased_games_fingerprint", "10:CUSA07917_00"),
+            ("async_get_purchased_games", PARSED_GAME_TITLES),
+            ("async_get_played_games", []),
+            ("get_psplus_status", True),
+            ("get_subscription_games", SUBSCRIPTION_GAMES),
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_imports_use_prefetched_data(psn_plugin, stored_credentials, psn_client_mocks, mocker):
+    mocker.patch("plugin.PSNPlugin.PREFETCH", True)
+    await psn_plugin.authenticate(stored_credentials)
+    await asyncio.sleep(0)
+    for mock in psn_client_mocks.values():
+        mock.assert_called_once()
+
+    assert await psn_plugin.get_owned_games() == GAMES
+    assert await psn_plugin.get_subscriptions() == [
+        Subscription(subscription_name="PlayStation PLUS", end_time=None, owned=True)
+    ]
+    assert [games async for games in psn_plugin.get_subscription_games("PlayStation PLUS", None)] == [
+        SUBSCRIPTION_GAMES
+    ]
+    for mock in psn_client_mocks.values():
+        mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_prefetch_is_fetched_again(psn_plugin, stored_credentials, psn_client_mocks, mocker):
+    mocker.patch("plugin.PSNPlugin.PREFETCH", True)
+    psn_client_mocks["get_psplus_status"].side_effect = [
+        async_raise(UnknownBackendResponse()), async_return_value(False)
+    ]
+    await psn_plugin.authenticate(stored_credentials)
+
+    assert await psn_plugin.get_subscriptions() == [
+        Subscription(subscription_name="PlayStation PLUS", end_time=None, owned=False)
+    ]
+    assert psn_client_mocks["get_psplus_status"].call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_no_prefetch_by_default(psn_plugin, stored_credentials, psn_client_mocks):
+    await psn_plugin.authenticate(stored_credentials)
+    await asyncio.sleep(0)
+
+    for mock in psn_client_mocks.values():
+        mock.assert_not_called()
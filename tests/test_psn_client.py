@@ -1,6 +1,12 @@
+import asyncio
+import json
 import math
 import pytest
-from galaxy.api.errors import UnknownBackendResponse
+from galaxy.api.errors import BackendError, BackendTimeout, UnknownBackendResponse, UnknownError
+
+from pagination import ConcurrencyWindow
+from psn_client import PLAYED_GAME_LIST_URL, PSNClient
+from retry import DEFAULT_MAX_ATTEMPTS
 
 
 GAMES = [
@@ -170,6 +176,17 @@ async def test_pagination(
     assert math.ceil(len(GAMES) / limit) == http_get.call_count
 
 
+@pytest.mark.asyncio
+async def test_pages_are_not_memoized(
+    http_get,
+    authenticated_psn_client,
+):
+    http_get.side_effect = create_backend_response_generator(13)()
+
+    await authenticated_psn_client.fetch_paginated_data(parser, GAMES_PAGE, "getGames", "totalCount", 13)
+    assert len(authenticated_psn_client._memo) == 0
+
+
 @pytest.mark.asyncio
 async def test_single_fetch(
     http_get,
@@ -205,6 +222,192 @@ async def test_no_total_results(
     http_get.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_cursor_pagination(
+    http_get,
+    authenticated_psn_client,
+):
+    limit = 13
+    responses = list(create_backend_response_generator(limit)())
+    for response in responses:
+        del response["data"]["getGames"]["pageInfo"]["totalCount"]
+    http_get.side_effect = responses
+
+    assert_all_games_fetched(await authenticated_psn_client.fetch_paginated_data(
+        parser, GAMES_PAGE, "getGames", "totalCount", limit))
+    assert [call[0][0] for call in http_get.call_args_list] == [
+        GAMES_PAGE.format(start=offset, size=limit) for offset in range(0, len(GAMES), limit)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_played_games_are_paginated(
+    http_get,
+    authenticated_psn_client,
+):
+    titles = [{"titleId": f"CUSA{i:05d}_00", "name": f"Game {i}"} for i in range(250)]
+
+    def response(offset):
+        return {"data": {"gameLibraryTitlesRetrieve": {
+            "games": titles[offset:offset + 100],
+            "pageInfo": {"totalCount": len(titles), "offset": offset, "size": 100}
+        }}}
+
+    http_get.side_effect = [response(0), response(100), response(200)]
+
+    games = await authenticated_psn_client.async_get_played_games()
+    assert [game.title_id for game in games] == [title["titleId"] for title in titles]
+    assert [call[0][0] for call in http_get.call_args_list] == [
+        PLAYED_GAME_LIST_URL.format(size=100, offset_variable=""),
+        PLAYED_GAME_LIST_URL.format(size=100, offset_variable=',"offset":100'),
+        PLAYED_GAME_LIST_URL.format(size=100, offset_variable=',"offset":200'),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_played_games_without_page_info(
+    http_get,
+    authenticated_psn_client,
+):
+    titles = [{"titleId": f"CUSA{i:05d}_00", "name": f"Game {i}"} for i in range(3)]
+    http_get.return_value = {"data": {"gameLibraryTitlesRetrieve": {"games": titles}}}
+
+    games = await authenticated_psn_client.async_get_played_games()
+    assert [game.title_id for game in games] == [title["titleId"] for title in titles]
+    http_get.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_full_list_without_page_info_is_reported(
+    http_get,
+    authenticated_psn_client,
+    caplog,
+):
+    limit = len(GAMES)
+    http_get.return_value = {"data": {"getGames": {"games": GAMES}}}
+
+    games = await authenticated_psn_client.fetch_paginated_data(parser, GAMES_PAGE, "getGames", "totalCount", limit)
+    assert games == [{g["id"]: g["name"]} for g in GAMES]
+    assert "may be truncated" in caplog.text
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("page_info", [
+    pytest.param({"totalCount": len(GAMES)}, id="offset"),
+    pytest.param({"isLast": False}, id="cursor"),
+])
+async def test_pages_ignoring_offset_are_not_repeated(
+    http_get,
+    authenticated_psn_client,
+    page_info,
+):
+    limit = 13
+    http_get.return_value = {"data": {"getGames": {"games": GAMES[:limit], "pageInfo": page_info}}}
+
+    games = await authenticated_psn_client.fetch_paginated_data(parser, GAMES_PAGE, "getGames", "totalCount", limit)
+    assert games == [{g["id"]: g["name"]} for g in GAMES[:limit]]
+
+
+@pytest.mark.asyncio
+async def test_page_size_follows_backend_limit(
+    http_get,
+    authenticated_psn_client,
+):
+    limit = 13
+    http_get.side_effect = create_backend_response_generator(limit)()
+
+    assert_all_games_fetched(await authenticated_psn_client.fetch_paginated_data(
+        parser, GAMES_PAGE, "getGames", "totalCount", 20))
+    assert http_get.call_args_list[1][0][0] == GAMES_PAGE.format(start=limit, size=limit)
+    assert authenticated_psn_client.page_sizes.page_size("getGames", 20, 20) == limit
+
+
+@pytest.mark.asyncio
+async def test_rejected_page_size_falls_back_to_served_one(
+    http_get,
+    authenticated_psn_client,
+):
+    max_size = 20
+    requested_sizes = []
+
+    def get(url, *args, **kwargs):
+        variables = json.loads(url[url.index("{"):])
+        requested_sizes.append(variables["size"])
+        if variables["size"] > max_size:
+            raise UnknownError("size too large")
+        start = variables["start"]
+        authenticated_psn_client._http_client.metrics.record_bytes("getGames", 1000)
+        return {"data": {"getGames": {
+            "games": GAMES[start:start + variables["size"]],
+            "pageInfo": {"totalCount": len(GAMES)}
+        }}}
+
+    http_get.side_effect = get
+    page_sizes = authenticated_psn_client.page_sizes
+
+    async def fetch():
+        requested_sizes.clear()
+        assert_all_games_fetched(await authenticated_psn_client.fetch_paginated_data(
+            parser, GAMES_PAGE, "getGames", "totalCount", max_size, max_limit=1000))
+
+    await fetch()
+    assert page_sizes.snapshot()["sizes"] == {"getGames": max_size}
+
+    await fetch()
+    assert requested_sizes[:2] == [2 * max_size, max_size]
+    snapshot = page_sizes.snapshot()
+    assert snapshot["sizes"] == {"getGames": max_size}
+    assert snapshot["limits"]["getGames"][0] == max_size
+
+    await fetch()
+    assert set(requested_sizes) == {max_size}
+
+
+@pytest.mark.asyncio
+async def test_page_size_grows_again_after_server_error(
+    http_get,
+    authenticated_psn_client,
+):
+    page_sizes = authenticated_psn_client.page_sizes
+    page_sizes.load({"sizes": {"getGames": 20}})
+    page_sizes.record("getGames", 20, 0.1, 1000)
+    http_get.side_effect = BackendError()
+
+    with pytest.raises(BackendError):
+        await authenticated_psn_client.fetch_paginated_data(
+            parser, GAMES_PAGE, "getGames", "totalCount", 10, max_limit=1000)
+    assert page_sizes.snapshot() == {"sizes": {"getGames": 20}, "limits": {}}
+
+    http_get.side_effect = create_backend_response_generator(40)()
+    assert_all_games_fetched(await authenticated_psn_client.fetch_paginated_data(
+        parser, GAMES_PAGE, "getGames", "totalCount", 10, max_limit=1000))
+    assert http_get.call_args_list[1][0][0] == GAMES_PAGE.format(start=0, size=40)
+
+
+@pytest.mark.asyncio
+async def test_body_timeout_halves_page_size_and_window(body_server, fast_retrying_client):
+    body_server.failures = DEFAULT_MAX_ATTEMPTS
+    psn_client = PSNClient(http_client=fast_retrying_client, pagination_window=ConcurrencyWindow(initial_size=4))
+
+    with pytest.raises(BackendTimeout):
+        await psn_client.fetch_paginated_data(
+            parser, body_server.url + "?limit={size}&offset={start}", "getGames", "totalCount", 100)
+    assert psn_client.page_sizes.page_size("getGames", 100, 100) == 50
+    assert psn_client.pagination_window.size == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_default_page_size_is_not_retried(
+    http_get,
+    authenticated_psn_client,
+):
+    http_get.side_effect = UnknownError()
+
+    with pytest.raises(UnknownError):
+        await authenticated_psn_client.fetch_paginated_data(parser, GAMES_PAGE, "getGames", "totalCount", 20)
+    http_get.assert_called_once()
+
+
 @pytest.mark.asyncio
 async def test_invalid_total_results(
     http_get,
@@ -217,3 +420,110 @@ async def test_invalid_total_results(
     with pytest.raises(UnknownBackendResponse):
         await authenticated_psn_client.fetch_paginated_data(parser, GAMES_PAGE, "getGames", "totalCount", len(GAMES))
     http_get.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_pagination_concurrency_is_bounded(
+    authenticated_psn_client,
+):
+    limit = 5
+    responses = create_backend_response_generator(limit)()
+    in_flight = 0
+    max_in_flight = 0
+
+    async def get(*args, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        response = next(responses)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return response
+
+    authenticated_psn_client._http_client.get = get
+    authenticated_psn_client.pagination_window = ConcurrencyWindow(min_size=1, max_size=3, initial_size=3)
+    assert_all_games_fetched(await authenticated_psn_client.fetch_paginated_data(
+        parser, GAMES_PAGE, "getGames", "totalCount", limit))
+    assert max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_are_shared(
+    http_get,
+    authenticated_psn_client,
+    user_profile,
+    account_id,
+    online_id,
+):
+    http_get.return_value = user_profile
+
+    assert await asyncio.gather(
+        authenticated_psn_client.async_get_own_user_info(),
+        authenticated_psn_client.get_psplus_status(),
+    ) == [(account_id, online_id), True]
+    http_get.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_response_is_memoized(
+    http_get,
+    authenticated_psn_client,
+    user_profile,
+):
+    http_get.return_value = user_profile
+
+    await authenticated_psn_client.async_get_own_user_info()
+    assert await authenticated_psn_client.get_psplus_status() is True
+    http_get.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_memoization_disabled(
+    http_get,
+    authenticated_psn_client,
+    user_profile,
+):
+    http_get.return_value = user_profile
+    authenticated_psn_client.memo_ttl = 0
+
+    await authenticated_psn_client.async_get_own_user_info()
+    await authenticated_psn_client.get_psplus_status()
+    assert http_get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_not_memoized(
+    http_get,
+    authenticated_psn_client,
+    user_profile,
+):
+    http_get.side_effect = [UnknownBackendResponse(), user_profile]
+
+    with pytest.raises(UnknownBackendResponse):
+        await authenticated_psn_client.get_psplus_status()
+    assert await authenticated_psn_client.get_psplus_status() is True
+
+
+@pytest.mark.asyncio
+async def test_request_is_cancelled_with_its_last_waiter(authenticated_psn_client):
+    request_cancelled = asyncio.Event()
+
+    async def get(*args, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            request_cancelled.set()
+            raise
+
+    authenticated_psn_client._http_client.get = get
+    first = asyncio.ensure_future(authenticated_psn_client.get_psplus_status())
+    second = asyncio.ensure_future(authenticated_psn_client.get_psplus_status())
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    assert not request_cancelled.is_set()
+
+    second.cancel()
+    await asyncio.sleep(0.01)
+    assert request_cancelled.is_set()
@@ -0,0 +1,184 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from galaxy.unittest.mock import async_return_value
+
+from library_cache import PSPLUS_STATUS, SUBSCRIPTION_GAMES, now
+from scheduler import BUDGET_WINDOW, RefreshScheduler
+from subscription_catalog import SubscriptionCatalog
+from tests.test_data import SUBSCRIPTION_GAMES as GAMES
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock():
+    return Clock()
+
+
+@pytest.fixture()
+def requests():
+    return []
+
+
+@pytest.fixture()
+def scheduler(clock, requests):
+    return RefreshScheduler(
+        lambda coro, description: asyncio.ensure_future(coro), lambda: len(requests), max_concurrency=2,
+        hourly_budget=3, jitter=0, clock=clock
+    )
+
+
+def refresh(calls, name, started=None):
+    """Returns refresh recording its call; with `calls` counted as requests by the scheduler it makes one request"""
+    async def inner():
+        calls.append(name)
+        if started is not None:
+            await started.wait()
+    return inner
+
+
+@pytest.mark.asyncio
+async def test_job_runs_on_its_interval(scheduler, clock):
+    calls = []
+    scheduler.add("a", refresh(calls, "a"), interval=10)
+
+    assert scheduler.tick() == []
+    clock.now += 10
+    await asyncio.gather(*scheduler.tick())
+    assert calls == ["a"]
+
+    clock.now += 5
+    assert scheduler.tick() == []
+    clock.now += 5
+    await asyncio.gather(*scheduler.tick())
+    assert calls == ["a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_running_job_is_not_started_again(scheduler, clock):
+    calls = []
+    release = asyncio.Event()
+    scheduler.add("a", refresh(calls, "a", release), interval=10, delay=0)
+
+    tasks = scheduler.tick()
+    await asyncio.sleep(0)
+    clock.now += 20
+    assert scheduler.tick() == []
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert calls == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_delays_most_recently_due(scheduler, clock):
+    calls = []
+    release = asyncio.Event()
+    scheduler.add("a", refresh(calls, "a", release), interval=100, delay=3)
+    scheduler.add("b", refresh(calls, "b", release), interval=100, delay=1)
+    scheduler.add("c", refresh(calls, "c", release), interval=100, delay=2)
+    clock.now += 3
+
+    tasks = scheduler.tick()
+    await asyncio.sleep(0)
+    assert calls == ["b", "c"]
+    assert scheduler.tick() == []
+
+    release.set()
+    await asyncio.gather(*tasks)
+    await asyncio.gather(*scheduler.tick())
+    assert calls == ["b", "c", "a"]
+
+
+@pytest.mark.asyncio
+async def test_hourly_budget(scheduler, clock, requests):
+    calls = requests
+    scheduler.add("a", refresh(calls, "a"), interval=60, delay=0)
+
+    for _ in range(5):
+        await asyncio.gather(*scheduler.tick())
+        clock.now += 60
+    assert len(calls) == 3
+
+    clock.now = 1000.0 + BUDGET_WINDOW
+    await asyncio.gather(*scheduler.tick())
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_budget_is_charged_with_requests_of_refresh(scheduler, clock, requests):
+    async def large_refresh():
+        requests.extend(["page"] * 5)
+
+    calls = []
+    scheduler.add("large", large_refresh, interval=60, delay=0)
+    await asyncio.gather(*scheduler.tick())
+    scheduler.add("small", refresh(calls, "small"), interval=60, delay=0)
+
+    assert scheduler.tick() == []
+    clock.now += BUDGET_WINDOW
+    await asyncio.gather(*scheduler.tick())
+    assert calls == ["small"]
+
+
+def test_jitter_spreads_next_run(clock):
+    scheduler = RefreshScheduler(MagicMock(), MagicMock(), jitter=0.5, clock=clock)
+    runs = set()
+    for _ in range(20):
+        scheduler.add("a", MagicMock(), interval=100)
+        runs.add(scheduler.jobs["a"].next_run)
+
+    assert len(runs) > 1
+    assert all(clock.now + 50 <= run <= clock.now + 150 for run in runs)
+
+
+async def run_refresh(plugin, name):
+    plugin._scheduler.jobs[name].next_run = 0
+    plugin.tick()
+    await plugin._scheduler.jobs[name].task
+
+
+@pytest.mark.asyncio
+async def test_psplus_status_is_refreshed_in_background(authenticated_plugin, mocker):
+    psplus_status = mocker.patch(
+        "psn_client.PSNClient.get_psplus_status", side_effect=[async_return_value(True), async_return_value(False)]
+    )
+    await authenticated_plugin.get_subscriptions()
+
+    await run_refresh(authenticated_plugin, PSPLUS_STATUS)
+
+    assert (await authenticated_plugin.get_subscriptions())[0].owned is False
+    assert psplus_status.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_subscription_catalog_is_refreshed_in_background(authenticated_plugin, mocker):
+    subscription_games = mocker.patch(
+        "psn_client.PSNClient.get_subscription_games", side_effect=lambda: async_return_value(GAMES[1:])
+    )
+    authenticated_plugin._library_cache.update(SUBSCRIPTION_GAMES, SubscriptionCatalog(GAMES, "outdated", now()))
+
+    await run_refresh(authenticated_plugin, SUBSCRIPTION_GAMES)
+
+    subscription_games.assert_called_once()
+    catalog = authenticated_plugin._library_cache.get_stale(SUBSCRIPTION_GAMES)
+    assert catalog.games == GAMES[1:]
+    assert not catalog.is_expired(now())
+
+
+@pytest.mark.asyncio
+async def test_valid_subscription_catalog_is_not_refreshed(authenticated_plugin, mocker):
+    subscription_games = mocker.patch("psn_client.PSNClient.get_subscription_games")
+    authenticated_plugin._library_cache.update(SUBSCRIPTION_GAMES, SubscriptionCatalog.create(GAMES, now()))
+
+    await run_refresh(authenticated_plugin, SUBSCRIPTION_GAMES)
+
+    subscription_games.assert_not_called()
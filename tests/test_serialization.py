@@ -0,0 +1,69 @@
+import base64
+import pickle
+
+import pytest
+
+from cache import CacheEntry
+from psn_client import GameRecord
+from serialization import COMPRESSED_HEADER, HEADER, SerializationVersionError, dumps, loads
+from subscription_catalog import SubscriptionCatalog
+from tests.test_data import PARSED_GAME_TITLES, SUBSCRIPTION_GAMES
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    True,
+    "10:CUSA07917_00",
+    {"sizes": {"purchasedTitlesRetrieve": 200}, "limits": {}},
+    {"~g": ["not", "a record"]},
+    ("tuple", 1),
+    CacheEntry(PARSED_GAME_TITLES, 1600000000),
+    CacheEntry(SubscriptionCatalog.create(SUBSCRIPTION_GAMES, 1600000000), 1600000000),
+])
+def test_round_trip(value):
+    assert loads(dumps(value)) == value
+
+
+def test_types_are_kept():
+    entry = loads(dumps(CacheEntry(PARSED_GAME_TITLES, 1600000000)))
+
+    assert type(entry.value[0]) is type(PARSED_GAME_TITLES[0])
+
+
+def test_legacy_pickle_is_rejected():
+    legacy = base64.encodebytes(pickle.dumps(CacheEntry(True, 1600000000))).decode()
+
+    with pytest.raises(SerializationVersionError):
+        loads(legacy)
+
+
+def test_other_version_is_rejected():
+    with pytest.raises(SerializationVersionError):
+        loads(dumps(True).replace("psn2:", "psn3:"))
+
+
+def test_unknown_type_is_not_serialized():
+    with pytest.raises(TypeError):
+        dumps(object())
+
+
+def test_unknown_tag_is_not_deserialized():
+    with pytest.raises(ValueError):
+        loads('psn2:{"~x":[]}')
+
+
+def test_large_payload_is_compressed():
+    entry = CacheEntry([GameRecord(f"CUSA{index:05d}_00", f"Game {index}") for index in range(1000)], 1600000000)
+    serialized = dumps(entry)
+
+    assert serialized.startswith(COMPRESSED_HEADER)
+    assert loads(serialized) == entry
+
+
+def test_small_payload_is_not_compressed():
+    assert dumps(True).startswith(HEADER)
+
+
+def test_corrupted_compressed_payload():
+    with pytest.raises(ValueError):
+        loads(COMPRESSED_HEADER + "bm90IGRlZmxhdGVk")
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+from galaxy.api.types import SubscriptionGame
+from galaxy.unittest.mock import async_return_value
+
+from library_cache import SUBSCRIPTION_GAMES
+from subscription_catalog import RECHECK_INTERVAL, SubscriptionCatalog, current_cycle_start, next_cycle_start, \
+    refresh_deadline
+from tests.test_data import SUBSCRIPTION_GAMES as SUBSCRIPTION_GAMES_LIST
+
+
+def timestamp(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+@pytest.mark.parametrize("now, current, following", [
+    (timestamp(2026, 10, 18), datetime(2026, 10, 6, 17, tzinfo=timezone.utc),
+     datetime(2026, 11, 3, 17, tzinfo=timezone.utc)),
+    (timestamp(2026, 10, 6, 16), datetime(2026, 9, 1, 17, tzinfo=timezone.utc),
+     datetime(2026, 10, 6, 17, tzinfo=timezone.utc)),
+    (timestamp(2026, 12, 20), datetime(2026, 12, 1, 17, tzinfo=timezone.utc),
+     datetime(2027, 1, 5, 17, tzinfo=timezone.utc)),
+    (timestamp(2027, 1, 2), datetime(2026, 12, 1, 17, tzinfo=timezone.utc),
+     datetime(2027, 1, 5, 17, tzinfo=timezone.utc)),
+])
+def test_cycle(now, current, following):
+    assert current_cycle_start(now) == current
+    assert next_cycle_start(now) == following
+
+
+def test_refresh_deadline():
+    assert refresh_deadline(timestamp(2026, 10, 18)) == timestamp(2026, 11, 3, 17)
+    # lineup may be published late
+    assert refresh_deadline(timestamp(2026, 10, 6, 18)) == timestamp(2026, 10, 6, 18) + RECHECK_INTERVAL
+
+
+def test_revalidated_with_same_games_keeps_catalog():
+    catalog = SubscriptionCatalog.create(SUBSCRIPTION_GAMES_LIST, timestamp(2026, 10, 6, 18))
+    revalidated = catalog.revalidated(list(reversed(SUBSCRIPTION_GAMES_LIST)), timestamp(2026, 10, 7))
+
+    assert revalidated.games is catalog.games
+    assert revalidated.deadline == timestamp(2026, 10, 7) + RECHECK_INTERVAL
+
+
+def test_revalidated_with_new_games():
+    catalog = SubscriptionCatalog.create(SUBSCRIPTION_GAMES_LIST, timestamp(2026, 10, 6, 18))
+    games = [SubscriptionGame(game_title="New", game_id="CUSA00001_00")]
+    revalidated = catalog.revalidated(games, timestamp(2026, 10, 7))
+
+    assert revalidated.games == games
+    assert revalidated.content_hash != catalog.content_hash
+    assert revalidated.deadline == timestamp(2026, 11, 3, 17)
+
+
+async def subscription_games(plugin):
+    return [games async for games in plugin.get_subscription_games("PlayStation PLUS", None)]
+
+
+@pytest.mark.asyncio
+async def test_catalog_is_served_until_deadline(authenticated_plugin, mocker):
+    get_subscription_games = mocker.patch(
+        "psn_client.PSNClient.get_subscription_games",
+        return_value=async_return_value(SUBSCRIPTION_GAMES_LIST)
+    )
+
+    assert await subscription_games(authenticated_plugin) == [SUBSCRIPTION_GAMES_LIST]
+    assert await subscription_games(authenticated_plugin) == [SUBSCRIPTION_GAMES_LIST]
+    get_subscription_games.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_expired_catalog_is_revalidated_in_background(authenticated_plugin, mocker):
+    new_games = [SubscriptionGame(game_title="New", game_id="CUSA00001_00")]
+    get_subscription_games = mocker.patch(
+        "psn_client.PSNClient.get_subscription_games",
+        return_value=async_return_value(new_games)
+    )
+    expired = SubscriptionCatalog.create(SUBSCRIPTION_GAMES_LIST, timestamp(2026, 9, 10))
+    authenticated_plugin._library_cache.update(SUBSCRIPTION_GAMES, expired, timestamp(2026, 9, 10))
+
+    assert await subscription_games(authenticated_plugin) == [SUBSCRIPTION_GAMES_LIST]
+    await authenticated_plugin._subscription_catalog_revalidation
+    get_subscription_games.assert_called_once()
+    assert await subscription_games(authenticated_plugin) == [new_games]
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from tasks import gather_or_cancel
+
+
+@pytest.mark.asyncio
+async def test_results_are_ordered():
+    async def result(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    assert await gather_or_cancel(result(1, 0.02), result(2, 0)) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_siblings():
+    sibling_cancelled = asyncio.Event()
+
+    async def sibling():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            sibling_cancelled.set()
+            raise
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        await asyncio.wait_for(gather_or_cancel(sibling(), failing()), 1)
+    assert sibling_cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_cancellation_is_propagated():
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def child():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.ensure_future(gather_or_cancel(child()))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert cancelled.is_set()